@@ -1,5 +1,7 @@
 from logging.config import fileConfig
+from app.core.config import settings
 from app.db.base import Base
+from app.models import hash_cache, user  # noqa: F401 — регистрируют таблицы в Base.metadata
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
@@ -14,11 +16,14 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# Схема живёт только в миграциях, поэтому база та же, что у приложения
+config.set_main_option("sqlalchemy.url", settings.DATABASE_URL.replace("%", "%%"))
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
-target_metadata = None
+target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -65,7 +70,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=Base.metadata
+            connection=connection, target_metadata=target_metadata
         )
 
         with context.begin_transaction():
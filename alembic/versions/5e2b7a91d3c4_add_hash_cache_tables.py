@@ -0,0 +1,56 @@
+"""Add hash cache tables
+
+Revision ID: 5e2b7a91d3c4
+Revises: 1cbb5ccc8506
+Create Date: 2026-10-18 15:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2b7a91d3c4'
+down_revision: Union[str, None] = '1cbb5ccc8506'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Базы, поднятые старым create_all при импорте main.py, уже содержат таблицы
+    if sa.inspect(op.get_bind()).has_table('cracked_hashes'):
+        return
+    op.create_table(
+        'cracked_hashes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('algorithm', sa.String(), nullable=False),
+        sa.Column('digest', sa.String(), nullable=False),
+        sa.Column('password', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('algorithm', 'digest'),
+    )
+    op.create_index(op.f('ix_cracked_hashes_id'), 'cracked_hashes', ['id'], unique=False)
+    op.create_index(op.f('ix_cracked_hashes_digest'), 'cracked_hashes', ['digest'], unique=False)
+    op.create_table(
+        'exhausted_keyspaces',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('algorithm', sa.String(), nullable=False),
+        sa.Column('digest', sa.String(), nullable=False),
+        sa.Column('attack', sa.String(), nullable=False),
+        sa.Column('max_length', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('algorithm', 'digest', 'attack', 'max_length'),
+    )
+    op.create_index(op.f('ix_exhausted_keyspaces_id'), 'exhausted_keyspaces', ['id'], unique=False)
+    op.create_index(op.f('ix_exhausted_keyspaces_digest'), 'exhausted_keyspaces', ['digest'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_exhausted_keyspaces_digest'), table_name='exhausted_keyspaces')
+    op.drop_index(op.f('ix_exhausted_keyspaces_id'), table_name='exhausted_keyspaces')
+    op.drop_table('exhausted_keyspaces')
+    op.drop_index(op.f('ix_cracked_hashes_digest'), table_name='cracked_hashes')
+    op.drop_index(op.f('ix_cracked_hashes_id'), table_name='cracked_hashes')
+    op.drop_table('cracked_hashes')
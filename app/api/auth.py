@@ -1,40 +1,88 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from jose import jwt
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+from collections import OrderedDict
 from datetime import datetime, timedelta
+import time
 from app.core.config import settings
-from app.schemas.auth import UserCreate, UserRead
-from app.db.session import SessionLocal
+from app.schemas.auth import UserCreate, UserRead, TokenData
+from app.core.security import HashingBusy
+from app.db.session import get_async_db
 from app.cruds import user as user_crud
 
 router = APIRouter()
+bearer = HTTPBearer()
+
+# Уже проверенные токены: повторный запрос с тем же токеном не декодирует JWT заново
+_token_cache = OrderedDict()
 
 def create_token(data: dict):
+    # jose тянет за собой криптографию, поэтому импортируется при первом токене
+    from jose import jwt
     expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode = data.copy()
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
-def get_db():
-    db = SessionLocal()
+def decode_token(token: str):
+    from jose import JWTError, jwt
+    cached = _token_cache.get(token)
+    if cached is not None:
+        data, expires = cached
+        if expires > time.time():
+            _token_cache.move_to_end(token)
+            return data
+        del _token_cache[token]
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    if payload.get("sub") is None or payload.get("exp") is None:
+        raise JWTError("Token has no subject or expiry")
+    data = TokenData(email=payload["sub"])
+    _token_cache[token] = (data, payload["exp"])
+    if len(_token_cache) > settings.TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
+    return data
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer)):
+    # async, чтобы проверка токена не занимала поток из общего threadpool
+    from jose import JWTError
     try:
-        yield db
-    finally:
-        db.close()
+        return decode_token(credentials.credentials)
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+async def get_admin_user(user: TokenData = Depends(get_current_user)):
+    if user.email not in settings.USER_ADMINS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user
+
+def _busy():
+    return HTTPException(status_code=503, detail="Server is busy, try again later", headers={"Retry-After": "1"})
 
 @router.post("/sign-up/", response_model=UserRead)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = user_crud.get_user_by_email(db, user.email)
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await user_crud.get_user_by_email_async(db, user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    created = user_crud.create_user(db, user.email, user.password)
+    try:
+        created = await user_crud.create_user_async(db, user.email, user.password)
+    except HashingBusy:
+        raise _busy()
     token = create_token({"sub": created.email})
     return UserRead(id=created.id, email=created.email, token=token)
 
 @router.post("/login/", response_model=UserRead)
-def login(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = user_crud.get_user_by_email(db, user.email)
-    if not db_user or not user_crud.verify_password(user.password, db_user.hashed_password):
+async def login(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await user_crud.get_user_by_email_async(db, user.email)
+    valid, new_hash = False, None
+    try:
+        if db_user is not None:
+            valid, new_hash = await user_crud.verify_and_update_async(user.password, db_user.hashed_password)
+    except HashingBusy:
+        raise _busy()
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid credentials")
+    if new_hash:
+        # Хеш устарел относительно текущей политики — заменяем, пока пароль известен
+        await user_crud.update_password_hash_async(db, db_user, new_hash)
     token = create_token({"sub": db_user.email})
     return UserRead(id=db_user.id, email=db_user.email, token=token)
@@ -1,21 +1,143 @@
-from fastapi import APIRouter
-from app.schemas.brute import BruteRequest
-from app.services.brute_service import start_brute_force
-from app.core.celery_app import celery_app
-from celery.result import AsyncResult
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.schemas.brute import BruteRequest, BatchBruteRequest
+from app.services.keyspace import build_keyspace
+from app.cruds import hash_cache
+from app.db.session import get_db
+from app.api.auth import get_current_user
+from app.schemas.auth import TokenData
+import asyncio
+import json
 
 router = APIRouter()
 
+FINAL_STATUSES = {"success", "failure"}
+KEEPALIVE_SECONDS = 15
+
+# Сервисы перебора тянут Celery и Redis, поэтому импортируются в обработчиках:
+# воркер API поднимается без них, а платит за импорт первый запрос к перебору
+
+def _check_request(hashes, req):
+    from app.services.brute_service import get_hasher
+    size = get_hasher(req.algorithm)().digest_size * 2
+    if any(len(hash_str) != size for hash_str in hashes):
+        raise HTTPException(status_code=400, detail=f"Hash length does not match {req.algorithm}")
+    try:
+        keyspace = build_keyspace(req.attack())
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if not keyspace.size:
+        raise HTTPException(status_code=400, detail="Keyspace is empty")
+
+def _own_job(task_id, user):
+    # Чужое задание неотличимо от несуществующего
+    from app.services.brute_service import job_owner
+    if job_owner(task_id) != user.email:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+def _admit(user, attack, algorithm, offset=0):
+    from app.services.scheduler import AdmissionError, admit
+    try:
+        return admit(user.email, attack, algorithm, offset)
+    except AdmissionError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+
+def _start(user, job_id, start, *args, **kwargs):
+    # Место в лимите уже занято под job_id; если запуск не удался, его надо вернуть
+    from app.services.scheduler import release_job
+    try:
+        return start(*args, **kwargs, owner=user.email, job_id=job_id)
+    except Exception:
+        release_job(user.email, job_id)
+        raise
+
 @router.post("/brut_hash")
-def brute_hash(req: BruteRequest):
-    task = start_brute_force(req.hash, req.charset, req.max_length)
-    return {"task_id": task.id}
+def brute_hash(req: BruteRequest, db: Session = Depends(get_db), user: TokenData = Depends(get_current_user)):
+    from app.services.brute_service import cached_result, start_brute_force
+    _check_request([req.hash], req)
+    cached, password, offset = cached_result(db, req.hash, req.attack(), req.algorithm)
+    if cached:
+        return {"task_id": None, "status": "success", "result": password, "cached": True}
+    queue, job_id = _admit(user, req.attack(), req.algorithm, offset)
+    task = _start(user, job_id, start_brute_force, req.hash, req.attack(), req.algorithm, offset, queue)
+    return {"task_id": task.id, "queue": queue}
+
+@router.post("/brut_hash/batch")
+def brute_hash_batch(req: BatchBruteRequest, db: Session = Depends(get_db), user: TokenData = Depends(get_current_user)):
+    from app.services.brute_service import start_batch_brute_force
+    _check_request(req.hashes, req)
+    cracked = hash_cache.get_cracked(db, req.algorithm, req.hashes)
+    pending = [hash_str for hash_str in req.hashes if hash_str not in cracked]
+    if not pending:
+        return {"task_id": None, "cached": cracked}
+    queue, job_id = _admit(user, req.attack(), req.algorithm)
+    task = _start(user, job_id, start_batch_brute_force, pending, req.attack(), req.algorithm, queue=queue)
+    return {"task_id": task.id, "queue": queue, "cached": cracked}
 
 @router.get("/get_status")
-def get_status(task_id: str):
-    result = AsyncResult(task_id, app=celery_app)
-    return {
-        "status": result.status.lower(),
-        "progress": result.info.get("progress", 0) if result.info else 0,
-        "result": result.result if result.successful() else None
-    }
+def get_status(task_id: str, user: TokenData = Depends(get_current_user)):
+    from app.services.brute_service import job_status
+    _own_job(task_id, user)
+    return job_status(task_id)
+
+@router.get("/get_batch_status")
+def get_batch_status(task_id: str, user: TokenData = Depends(get_current_user)):
+    from app.services.brute_service import batch_status
+    _own_job(task_id, user)
+    return batch_status(task_id)
+
+@router.post("/pause")
+def pause(task_id: str, user: TokenData = Depends(get_current_user)):
+    from app.services.brute_service import pause_job
+    _own_job(task_id, user)
+    pause_job(task_id)
+    return {"task_id": task_id, "status": "pausing"}
+
+@router.post("/resume")
+def resume(task_id: str, user: TokenData = Depends(get_current_user)):
+    from app.services.brute_service import resume_job
+    _own_job(task_id, user)
+    try:
+        resumed = resume_job(task_id)
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    return {"task_id": task_id, "resumed_shards": resumed}
+
+def _sse(kind, data):
+    return f"event: {kind}\ndata: {json.dumps(data)}\n\n"
+
+async def _event_stream(task_id):
+    from app.services.brute_service import any_status
+    from app.services.events import hub
+    # Подписка раньше снимка состояния, чтобы не потерять события между ними
+    queue = hub.subscribe(task_id)
+    try:
+        status = await run_in_threadpool(any_status, task_id)
+        yield _sse("status", status)
+        while status["status"] not in FINAL_STATUSES:
+            try:
+                event = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                # Долгая тишина: событие могло потеряться, статус перечитывается
+                fresh = await run_in_threadpool(any_status, task_id)
+                if fresh == status:
+                    yield ": keepalive\n\n"
+                else:
+                    status = fresh
+                    yield _sse("status", status)
+                continue
+            # Сводный статус после done и paused присылает hub, один на всех клиентов
+            if event["type"] == "status":
+                status = event["data"]
+                yield _sse("status", status)
+            else:
+                yield _sse(event["type"], event)
+    finally:
+        hub.unsubscribe(task_id, queue)
+
+@router.get("/events")
+async def events(task_id: str, user: TokenData = Depends(get_current_user)):
+    await run_in_threadpool(_own_job, task_id, user)
+    return StreamingResponse(_event_stream(task_id), media_type="text/event-stream")
@@ -0,0 +1,9 @@
+from fastapi import APIRouter, Response
+from app.core.metrics import metrics_response
+
+router = APIRouter()
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = metrics_response()
+    return Response(body, media_type=content_type)
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal
+from app.api.auth import get_admin_user
+from app.db.session import get_async_db
+from app.schemas.auth import TokenData, UserImportResult
+from app.services.user_transfer import import_users, export_users
+
+router = APIRouter()
+
+Format = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+@router.post("/users/import", response_model=UserImportResult)
+async def import_users_route(
+    request: Request,
+    format: Format = "ndjson",
+    db: AsyncSession = Depends(get_async_db),
+    user: TokenData = Depends(get_admin_user),
+):
+    # Тело читается потоком, а не целиком: файл может быть на сотни мегабайт
+    return await import_users(db, request.stream(), format)
+
+@router.get("/users/export")
+async def export_users_route(format: Format = "ndjson", user: TokenData = Depends(get_admin_user)):
+    return StreamingResponse(export_users(format), media_type=MEDIA_TYPES[format])
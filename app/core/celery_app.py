@@ -1,7 +1,21 @@
 from celery import Celery
+from app.core.config import settings
+from app.core.metrics import instrument_celery
 
 celery_app = Celery(
     "worker",
     broker="redis://localhost:6379/0",
-    backend="redis://localhost:6379/0"
+    backend="redis://localhost:6379/0",
+    include=["app.services.brute_service"],
 )
+
+# Шарды длинные, поэтому воркер не должен забирать их из очереди про запас
+celery_app.conf.worker_prefetch_multiplier = 1
+# Шард подтверждается только после завершения (acks_late): пока он идёт, Redis
+# не должен отдать его второму воркеру, поэтому таймаут видимости берётся
+# с запасом от самого долгого шарда, который пропускает admit
+# Состояния шардов нужны, пока живо задание: на паузе оно может стоять дольше суток
+celery_app.conf.result_expires = settings.BRUTE_JOB_TTL_SECONDS
+celery_app.conf.broker_transport_options = {"visibility_timeout": int(settings.BRUTE_MAX_SHARD_SECONDS * 2)}
+
+instrument_celery(celery_app, settings.WORKER_METRICS_PORT)
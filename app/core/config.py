@@ -1,10 +1,57 @@
 from pydantic_settings import BaseSettings
+from typing import List, Literal
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./test.db"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_RECYCLE: int = 1800
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268_435_456
+    SQLITE_CACHE_KB: int = 65_536
     SECRET_KEY: str = "supersecretkey"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    BRUTE_SHARD_SIZE: int = 50_000_000
+    BRUTE_MAX_SHARDS: int = 64
+    BRUTE_LOCAL_PROCESSES: int = 1
+    BRUTE_ENGINE: str = "prefix"
+    BRUTE_CHECKPOINT_SECONDS: float = 5.0
+    BRUTE_PROGRESS_SECONDS: float = 0.5
+    BRUTE_SMALL_JOB_COST: float = 1e8
+    BRUTE_MEDIUM_JOB_COST: float = 1e10
+    BRUTE_MAX_JOB_COST: float = 1e14
+    BRUTE_USER_MAX_JOBS: int = 3
+    BRUTE_SHARD_RATE: float = 5e6
+    BRUTE_MAX_SHARD_SECONDS: float = 86_400.0
+    BRUTE_JOB_TTL_SECONDS: int = 7 * 86_400
+    PASSWORD_SCHEME: Literal["bcrypt", "argon2"] = "bcrypt"
+    PASSWORD_HASH_ROUNDS: int = 12
+    PASSWORD_HASH_TARGET_MS: float = 250.0
+    ARGON2_MEMORY_COST: int = 65_536
+    ARGON2_PARALLELISM: int = 2
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    TOKEN_CACHE_SIZE: int = 10_000
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Literal["memory", "redis"] = "memory"
+    RATE_LIMIT_REDIS_URL: str = ""
+    RATE_LIMIT_TRUST_FORWARDED: bool = False
+    RATE_LIMIT_TRUSTED_HOPS: int = 1
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    RATE_LIMIT_IP_RATE: float = 20.0
+    RATE_LIMIT_IP_BURST: int = 40
+    RATE_LIMIT_AUTH_IP_RATE: float = 1.0
+    RATE_LIMIT_AUTH_IP_BURST: int = 10
+    RATE_LIMIT_AUTH_EMAIL_RATE: float = 0.2
+    RATE_LIMIT_AUTH_EMAIL_BURST: int = 5
+    RATE_LIMIT_AUTH_MAX_BODY: int = 4096
+    WORKER_METRICS_PORT: int = 0
+    PROFILING_ENABLED: bool = False
+    USER_ADMINS: List[str] = []
+    USER_IMPORT_BATCH_SIZE: int = 5000
+    USER_IMPORT_HASH_PROCESSES: int = 0
+    USER_IMPORT_MAX_ERRORS: int = 100
 
     class Config:
         env_file = ".env"
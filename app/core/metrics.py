@@ -0,0 +1,117 @@
+from contextvars import ContextVar
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest, start_http_server
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import time
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"]
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "DB queries per HTTP request", ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+REQUEST_DB_TIME = Histogram("http_request_db_seconds", "DB time per HTTP request", ["route"])
+PASSWORD_HASH_TIME = Histogram(
+    "password_hash_duration_seconds", "Password hash and verify time", ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+TASK_QUEUE_WAIT = Histogram(
+    "brute_task_queue_wait_seconds", "Time a brute task waited in the broker", ["task"],
+    buckets=(0.01, 0.1, 0.5, 1, 5, 15, 60, 300, 1800, 3600),
+)
+TASK_RUN_TIME = Histogram(
+    "brute_task_run_seconds", "Brute task run time", ["task", "state"],
+    buckets=(0.1, 1, 5, 15, 60, 300, 1800, 3600, 14400),
+)
+CANDIDATES = Counter("brute_candidates_total", "Candidates checked by brute tasks", ["algorithm"])
+CANDIDATE_RATE = Histogram(
+    "brute_candidates_per_second", "Average candidate rate of a brute shard", ["algorithm"],
+    buckets=(1e4, 1e5, 3e5, 1e6, 3e6, 1e7, 3e7, 1e8),
+)
+
+# Счётчик запросов к БД текущего HTTP-запроса: [число, секунды]
+_db_usage = ContextVar("db_usage", default=None)
+_task_started = {}
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    usage = _db_usage.get()
+    if usage is not None:
+        usage[0] += 1
+        usage[1] += elapsed
+
+def observe_password_hash(operation, func, *args):
+    started = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        PASSWORD_HASH_TIME.labels(operation).observe(time.perf_counter() - started)
+
+def observe_shard(algorithm, candidates, seconds):
+    CANDIDATES.labels(algorithm).inc(candidates)
+    if seconds > 0:
+        CANDIDATE_RATE.labels(algorithm).observe(candidates / seconds)
+
+def metrics_response():
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+class MetricsMiddleware:
+    # Маршрут берётся из шаблона пути, а не из URL, чтобы task_id
+    # и прочие параметры не плодили метки
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        usage = [0, 0.0]
+        token = _db_usage.set(usage)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _db_usage.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_LATENCY.labels(scope["method"], route, status[0]).observe(time.perf_counter() - started)
+            REQUEST_DB_QUERIES.labels(route).observe(usage[0])
+            REQUEST_DB_TIME.labels(route).observe(usage[1])
+
+def instrument_celery(celery_app, port):
+    from celery.signals import before_task_publish, task_postrun, task_prerun, worker_init
+
+    @before_task_publish.connect(weak=False)
+    def stamp_sent_at(headers=None, **kwargs):
+        headers["sent_at"] = time.time()
+
+    @task_prerun.connect(weak=False)
+    def start_timer(task_id=None, task=None, **kwargs):
+        sent_at = getattr(task.request, "sent_at", None)
+        if sent_at:
+            TASK_QUEUE_WAIT.labels(task.name).observe(max(time.time() - sent_at, 0))
+        _task_started[task_id] = time.perf_counter()
+
+    @task_postrun.connect(weak=False)
+    def stop_timer(task_id=None, task=None, state=None, **kwargs):
+        started = _task_started.pop(task_id, None)
+        if started is not None:
+            TASK_RUN_TIME.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - started)
+
+    @worker_init.connect(weak=False)
+    def serve_metrics(**kwargs):
+        # У воркера свой реестр метрик, поэтому и свой HTTP-порт для Prometheus
+        if port:
+            start_http_server(port)
@@ -0,0 +1,53 @@
+# pyinstrument — необязательная зависимость: pip install -r requirements-profiling.txt
+from pyinstrument import Profiler
+from urllib.parse import parse_qs
+from app.core.config import settings
+
+def _is_admin(scope):
+    # Тот же токен и тот же список USER_ADMINS, что у get_admin_user
+    from jose import JWTError
+    from app.api.auth import decode_token
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return False
+            try:
+                return decode_token(token).email in settings.USER_ADMINS
+            except JWTError:
+                return False
+    return False
+
+class ProfilerMiddleware:
+    # Включается параметром ?profile=1 в запросе администратора: ответ обработчика
+    # отбрасывается, вместо него возвращается HTML-отчёт семплирующего профайлера.
+    # У остальных запросов параметр ни на что не влияет
+    def __init__(self, app, interval=0.001):
+        self.app = app
+        self.interval = interval
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or "1" not in parse_qs(scope["query_string"].decode()).get("profile", [])
+            or not _is_admin(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def discard(message):
+            pass
+
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+        body = profiler.output_html().encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/html; charset=utf-8")],
+        })
+        await send({"type": "http.response.body", "body": body})
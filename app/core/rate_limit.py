@@ -0,0 +1,169 @@
+from collections import OrderedDict
+import json
+import math
+import time
+from app.core.config import settings
+
+AUTH_PATHS = {"/login/", "/sign-up/"}
+
+# Ведро хранится в хеше Redis; время берётся у Redis, чтобы у всех инстансов были одни часы
+REDIS_BUCKET_SCRIPT = """
+local now = redis.call("TIME")
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local state = redis.call("HMGET", KEYS[1], "tokens", "updated")
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * rate)
+local wait = 0
+if tokens < 1 then
+    wait = (1 - tokens) / rate
+else
+    tokens = tokens - 1
+end
+redis.call("HSET", KEYS[1], "tokens", tokens, "updated", now)
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+class MemoryBuckets:
+    # Ведра одного процесса; самые давние ключи вытесняются, чтобы поток
+    # случайных IP и email не съел память
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    async def take(self, key, rate, capacity):
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens < 1:
+            wait = (1 - tokens) / rate
+        else:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+class RedisBuckets:
+    # Общие ведра для нескольких инстансов API
+    def __init__(self, url):
+        import redis.asyncio as aioredis
+        self._client = aioredis.from_url(url)
+        self._script = self._client.register_script(REDIS_BUCKET_SCRIPT)
+
+    async def take(self, key, rate, capacity):
+        from redis.exceptions import RedisError
+        try:
+            return float(await self._script(keys=[f"rate-limit-{key}"], args=[rate, capacity]))
+        except RedisError:
+            # Упавший Redis не должен закрывать вход всем пользователям
+            return 0.0
+
+def create_buckets():
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        from app.core.celery_app import celery_app
+        return RedisBuckets(settings.RATE_LIMIT_REDIS_URL or celery_app.conf.result_backend)
+    return MemoryBuckets(settings.RATE_LIMIT_MAX_KEYS)
+
+def _client_ip(scope):
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        # Левые адреса пишет сам клиент; верить можно только тем, что дописали
+        # наши прокси справа, по одному на RATE_LIMIT_TRUSTED_HOPS
+        hops = [
+            hop.strip()
+            for name, value in scope["headers"] if name == b"x-forwarded-for"
+            for hop in value.decode("latin-1").split(",") if hop.strip()
+        ]
+        if hops:
+            return hops[-min(len(hops), max(1, settings.RATE_LIMIT_TRUSTED_HOPS))]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+def _email(body):
+    try:
+        email = json.loads(body).get("email")
+    except (ValueError, AttributeError):
+        return None
+    return email.strip().lower() if isinstance(email, str) else None
+
+async def _read_body(receive, limit):
+    # None, если тело больше limit: дальше лимита оно не читается
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+class RateLimitMiddleware:
+    # Чистый ASGI, а не BaseHTTPMiddleware: тело логина читается один раз
+    # и отдаётся обработчику заново, а отказ уходит до любых запросов к БД и bcrypt
+    def __init__(self, app, buckets=None):
+        self.app = app
+        self.buckets = buckets or create_buckets()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        ip = _client_ip(scope)
+        if scope["path"] not in AUTH_PATHS:
+            wait = await self.buckets.take(f"ip:{ip}", settings.RATE_LIMIT_IP_RATE, settings.RATE_LIMIT_IP_BURST)
+            if wait:
+                await self._reject(send, wait)
+                return
+            await self.app(scope, receive, send)
+            return
+
+        # Сначала ведро IP: отклонённый клиент не заставит сервер читать тело
+        wait = await self.buckets.take(
+            f"auth-ip:{ip}", settings.RATE_LIMIT_AUTH_IP_RATE, settings.RATE_LIMIT_AUTH_IP_BURST
+        )
+        if wait:
+            await self._reject(send, wait)
+            return
+        body = await _read_body(receive, settings.RATE_LIMIT_AUTH_MAX_BODY)
+        if body is None:
+            await self._send_json(send, 413, [], b'{"detail":"Request body too large"}')
+            return
+        email = _email(body)
+        if email:
+            wait = await self.buckets.take(
+                f"auth-email:{email}", settings.RATE_LIMIT_AUTH_EMAIL_RATE, settings.RATE_LIMIT_AUTH_EMAIL_BURST
+            )
+        if wait:
+            await self._reject(send, wait)
+            return
+
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if replayed:
+                return await receive()
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        await self.app(scope, replay, send)
+
+    async def _reject(self, send, wait):
+        await self._send_json(
+            send, 429, [(b"retry-after", str(math.ceil(wait)).encode())], b'{"detail":"Too many requests"}'
+        )
+
+    async def _send_json(self, send, status, headers, body):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json")] + headers,
+        })
+        await send({"type": "http.response.body", "body": body})
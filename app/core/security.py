@@ -0,0 +1,113 @@
+from concurrent.futures import ThreadPoolExecutor
+from app.core.config import settings
+from app.core.metrics import observe_password_hash
+import asyncio
+import math
+import time
+
+# Стоимость (rounds): у bcrypt это log2 числа итераций, у argon2 — time_cost
+MIN_ROUNDS = {"bcrypt": 10, "argon2": 2}
+MAX_ROUNDS = {"bcrypt": 16, "argon2": 32}
+# Калибровка идёт на дешёвой стоимости и экстраполируется
+CALIBRATION_ROUNDS = {"bcrypt": 8, "argon2": 1}
+
+_context = None
+_policy = {}
+
+def configured_policy():
+    return {
+        "scheme": settings.PASSWORD_SCHEME,
+        "rounds": settings.PASSWORD_HASH_ROUNDS,
+        "memory_cost": settings.ARGON2_MEMORY_COST,
+        "parallelism": settings.ARGON2_PARALLELISM,
+    }
+
+def password_policy():
+    return dict(_policy or configured_policy())
+
+def _policy_options(policy):
+    # Хеш дешевле политики или дороже её больше чем на ступень помечается
+    # для перехеширования; ступень запаса гасит разброс калибровки между воркерами
+    scheme, rounds = policy["scheme"], policy["rounds"]
+    options = {
+        f"{scheme}__default_rounds": rounds,
+        f"{scheme}__min_rounds": rounds,
+        f"{scheme}__max_rounds": rounds + 1,
+    }
+    if scheme == "argon2":
+        options["argon2__memory_cost"] = policy["memory_cost"]
+        options["argon2__parallelism"] = policy["parallelism"]
+    return {"default": scheme, **options}
+
+def get_pwd_context():
+    # passlib подгружается при первом хешировании, а не при старте приложения
+    global _context
+    if _context is None:
+        from passlib.context import CryptContext
+        # Схема по умолчанию задаётся политикой; хеши другой схемы считаются устаревшими
+        context = CryptContext(schemes=["bcrypt", "argon2"], deprecated="auto")
+        context.update(**_policy_options(password_policy()))
+        _context = context
+    return _context
+
+def apply_password_policy(policy):
+    _policy.clear()
+    _policy.update(policy)
+    if _context is not None:
+        _context.update(**_policy_options(policy))
+
+def _verify_seconds(policy, rounds):
+    handler = get_pwd_context().handler(policy["scheme"])
+    if policy["scheme"] == "argon2":
+        handler = handler.using(rounds=rounds, memory_cost=policy["memory_cost"], parallelism=policy["parallelism"])
+    else:
+        handler = handler.using(rounds=rounds)
+    hashed = handler.hash("calibration")
+    best = math.inf
+    for _ in range(3):
+        started = time.perf_counter()
+        handler.verify("calibration", hashed)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def calibrate_password_policy():
+    # Подбирает стоимость под PASSWORD_HASH_TARGET_MS на текущем железе
+    policy = configured_policy()
+    scheme = policy["scheme"]
+    if settings.PASSWORD_HASH_TARGET_MS > 0:
+        base = CALIBRATION_ROUNDS[scheme]
+        ratio = settings.PASSWORD_HASH_TARGET_MS / 1000 / _verify_seconds(policy, base)
+        # bcrypt удваивает время на каждую ступень, argon2 растёт линейно
+        rounds = base + round(math.log2(ratio)) if scheme == "bcrypt" else round(base * ratio)
+        policy["rounds"] = min(max(rounds, MIN_ROUNDS[scheme]), MAX_ROUNDS[scheme])
+    apply_password_policy(policy)
+    return policy
+
+# bcrypt отпускает GIL, поэтому хватает отдельного пула потоков; общий
+# threadpool FastAPI при этом остаётся свободным для остальных маршрутов
+_executor = ThreadPoolExecutor(settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_pending = 0
+
+class HashingBusy(Exception):
+    pass
+
+async def _offload(func, *args):
+    # Очередь к пулу ограничена: лишние запросы сразу получают отказ,
+    # а не копятся и не растягивают задержку всем остальным
+    global _pending
+    if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise HashingBusy("Too many password hashing requests")
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    finally:
+        _pending -= 1
+
+async def hash_password(password):
+    return await _offload(observe_password_hash, "hash", get_pwd_context().hash, password)
+
+async def verify_and_update(plain_password, hashed_password):
+    # Возвращает (верен ли пароль, новый хеш или None, если хеш соответствует политике)
+    return await _offload(
+        observe_password_hash, "verify", get_pwd_context().verify_and_update, plain_password, hashed_password
+    )
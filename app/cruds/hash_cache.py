@@ -0,0 +1,44 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.hash_cache import CrackedHash, ExhaustedKeyspace
+
+def get_cracked(db: Session, algorithm: str, digests):
+    rows = db.query(CrackedHash).filter(
+        CrackedHash.algorithm == algorithm, CrackedHash.digest.in_(list(digests))
+    )
+    return {row.digest: row.password for row in rows}
+
+def save_cracked(db: Session, algorithm: str, found: dict):
+    known = get_cracked(db, algorithm, found)
+    db.add_all(
+        CrackedHash(algorithm=algorithm, digest=digest, password=password)
+        for digest, password in found.items() if digest not in known
+    )
+    db.commit()
+
+def get_exhausted_length(db: Session, algorithm: str, digest: str, attack: str):
+    # Наибольшая max_length, для которой пространство уже перебрано без результата.
+    # Для режимов без длины запись хранится с max_length = 0, None — записей нет
+    return db.query(func.max(ExhaustedKeyspace.max_length)).filter(
+        ExhaustedKeyspace.algorithm == algorithm,
+        ExhaustedKeyspace.digest == digest,
+        ExhaustedKeyspace.attack == attack,
+    ).scalar()
+
+def _insert_ignore(db: Session, model):
+    # INSERT ... ON CONFLICT DO NOTHING: одну и ту же запись могут записать
+    # одновременно несколько шардов, и это не ошибка
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model).on_conflict_do_nothing()
+
+def save_exhausted(db: Session, algorithm: str, digests, attack: str, max_length: int):
+    rows = [
+        {"algorithm": algorithm, "digest": digest, "attack": attack, "max_length": max_length}
+        for digest in digests
+    ]
+    if rows:
+        db.execute(_insert_ignore(db, ExhaustedKeyspace), rows)
+        db.commit()
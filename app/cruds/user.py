@@ -1,19 +1,39 @@
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.user import User
-from passlib.context import CryptContext
+from app.core import security
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+async def get_user_by_email_async(db: AsyncSession, email: str):
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
-
-def create_user(db: Session, email: str, password: str):
-    hashed = pwd_context.hash(password)
+async def create_user_async(db: AsyncSession, email: str, password: str):
+    hashed = await security.hash_password(password)
     user = User(email=email, hashed_password=hashed)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_and_update_async(plain_password, hashed_password):
+    return await security.verify_and_update(plain_password, hashed_password)
+
+async def update_password_hash_async(db: AsyncSession, user: User, hashed_password: str):
+    user.hashed_password = hashed_password
+    await db.commit()
+
+async def existing_emails_async(db: AsyncSession, emails):
+    result = await db.execute(select(User.email).where(User.email.in_(emails)))
+    return set(result.scalars())
+
+async def insert_users_async(db: AsyncSession, rows):
+    # Один executemany и один commit на всю пачку
+    await db.execute(insert(User), rows)
+    await db.commit()
+
+async def stream_users_async(db: AsyncSession, batch_size: int):
+    query = select(User.email, User.hashed_password).order_by(User.id).execution_options(yield_per=batch_size)
+    result = await db.stream(query)
+    async for row in result:
+        yield row
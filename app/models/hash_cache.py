@@ -0,0 +1,22 @@
+from sqlalchemy import String, Integer, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class CrackedHash(Base):
+    __tablename__ = "cracked_hashes"
+    __table_args__ = (UniqueConstraint("algorithm", "digest"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    algorithm: Mapped[str] = mapped_column(String)
+    digest: Mapped[str] = mapped_column(String, index=True)
+    password: Mapped[str] = mapped_column(String)
+
+class ExhaustedKeyspace(Base):
+    __tablename__ = "exhausted_keyspaces"
+    __table_args__ = (UniqueConstraint("algorithm", "digest", "attack", "max_length"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    algorithm: Mapped[str] = mapped_column(String)
+    digest: Mapped[str] = mapped_column(String, index=True)
+    attack: Mapped[str] = mapped_column(String)
+    max_length: Mapped[int] = mapped_column(Integer, default=0)
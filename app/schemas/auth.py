@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, model_validator
+from typing import List, Optional
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -12,3 +12,20 @@ class UserRead(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str]
+
+
+class UserImportRecord(BaseModel):
+    email: EmailStr
+    password: Optional[str] = None
+    hashed_password: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_password(self):
+        if (self.password is None) == (self.hashed_password is None):
+            raise ValueError("exactly one of password or hashed_password is required")
+        return self
+
+class UserImportResult(BaseModel):
+    imported: int
+    skipped: int
+    errors: List[dict]
@@ -1,6 +1,64 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import List, Literal, Optional
 
-class BruteRequest(BaseModel):
+Algorithm = Literal["md5", "sha1", "sha256", "sha512"]
+
+# Дальше пространство всё равно не перебрать, а размер считается уже в запросе API
+MAX_CHARSET_LENGTH = 64
+MAX_BATCH_HASHES = 10_000
+
+def _check_hex(value):
+    try:
+        bytes.fromhex(value)
+    except ValueError:
+        raise ValueError("hash must be a hex string")
+    return value.lower()
+
+class AttackParams(BaseModel):
+    mode: Literal["charset", "mask", "dictionary"] = "charset"
+    charset: Optional[str] = None
+    max_length: Optional[int] = Field(default=None, ge=1, le=MAX_CHARSET_LENGTH)
+    mask: Optional[str] = None
+    words: Optional[List[str]] = None
+    rules: List[str] = [":"]
+    algorithm: Algorithm = "md5"
+
+    @field_validator("charset")
+    @classmethod
+    def check_charset(cls, value):
+        if value is not None and (not value or not value.isascii()):
+            raise ValueError("charset must be a non-empty ASCII string")
+        return value
+
+    @model_validator(mode="after")
+    def check_mode(self):
+        required = {"charset": ("charset", "max_length"), "mask": ("mask",), "dictionary": ("words",)}
+        missing = [name for name in required[self.mode] if getattr(self, name) is None]
+        if missing:
+            raise ValueError(f"{self.mode} mode requires: {', '.join(missing)}")
+        return self
+
+    def attack(self):
+        if self.mode == "charset":
+            return {"mode": "charset", "charset": self.charset, "max_length": self.max_length}
+        if self.mode == "mask":
+            return {"mode": "mask", "mask": self.mask}
+        return {"mode": "dictionary", "words": self.words, "rules": self.rules}
+
+class BruteRequest(AttackParams):
     hash: str
-    charset: str
-    max_length: int
+
+    @field_validator("hash")
+    @classmethod
+    def check_hex(cls, value):
+        return _check_hex(value)
+
+class BatchBruteRequest(AttackParams):
+    hashes: List[str] = Field(max_length=MAX_BATCH_HASHES)
+
+    @field_validator("hashes")
+    @classmethod
+    def check_hashes(cls, value):
+        if not value:
+            raise ValueError("hashes must not be empty")
+        return list(dict.fromkeys(_check_hex(item) for item in value))
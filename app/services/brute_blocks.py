@@ -0,0 +1,49 @@
+from math import prod
+from operator import methodcaller
+import numpy as np
+
+BLOCK_SIZE = 65_536
+
+_digest = methodcaller("digest")
+
+def generate_blocks(positions, start=0, stop=None, block_size=BLOCK_SIZE):
+    # Кандидаты блоками: строка массива uint8 — один кандидат.
+    # Разряды считаются смешанным счётчиком по всему блоку сразу
+    radix = [len(symbols) for symbols in positions]
+    if stop is None:
+        stop = prod(radix)
+    tables = [np.frombuffer(symbols, dtype=np.uint8) for symbols in positions]
+    offsets = np.arange(block_size, dtype=np.int64)
+    for block_start in range(start, stop, block_size):
+        count = min(block_size, stop - block_start)
+        # Начало блока может не влезать в int64, поэтому его разряды считает Python,
+        # а в numpy складываются только небольшие смещения внутри блока
+        base = [0] * len(radix)
+        value = block_start
+        for pos in range(len(radix) - 1, -1, -1):
+            value, base[pos] = divmod(value, radix[pos])
+        block = np.empty((count, len(radix)), dtype=np.uint8)
+        carry = offsets[:count]
+        for pos in range(len(radix) - 1, -1, -1):
+            carry, digit = np.divmod(carry + base[pos], radix[pos])
+            block[:, pos] = tables[pos][digit]
+        yield block
+
+def digest_block(block, hasher):
+    # Строки как сырые байты: вид S{n} отрезал бы кандидату хвостовые \x00
+    rows = block.view(f"V{block.shape[1]}").ravel().tolist()
+    return list(map(_digest, map(hasher, rows)))
+
+def crack_blocks(targets, positions, hasher, on_found, on_progress=None, start=0, stop=None):
+    # Та же сигнатура, что у crack_positions, чтобы движки были взаимозаменяемы
+    for block in generate_blocks(positions, start, stop):
+        digests = digest_block(block, hasher)
+        hits = sorted((digests.index(digest), digest) for digest in targets.intersection(digests))
+        for index, digest in hits:
+            targets.discard(digest)
+            on_found(digest, block[index].tobytes())
+        if not targets:
+            return True
+        if on_progress and on_progress(len(block)):
+            return True
+    return False
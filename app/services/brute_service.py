@@ -1,24 +1,558 @@
 from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.metrics import observe_shard
+from app.cruds import hash_cache
+from app.db.session import SessionLocal
+from app.services.events import publish_event
+from app.services.keyspace import build_keyspace, crack_positions
+from celery import group, states
+from celery.exceptions import Ignore
+from celery.result import GroupResult
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import hashlib
 import itertools
+import json
+import multiprocessing
+import os
 import time
 
+ALGORITHMS = {
+    "md5": hashlib.md5,
+    "sha1": hashlib.sha1,
+    "sha256": hashlib.sha256,
+    "sha512": hashlib.sha512,
+}
+
+PROGRESS_STEP = 10_000
+POOL_POLL_INTERVAL = 0.2
+PAUSED = "PAUSED"
+
+_pool_stop = None
+_pool_tried = None
+_pool_positions = None
+_pool_found = None
+
 def generate_passwords(charset, max_length):
     for length in range(1, max_length + 1):
         for pwd in itertools.product(charset, repeat=length):
             yield ''.join(pwd)
 
-@celery_app.task(bind=True)
-def brute_task(self, hash_str, charset, max_length):
-    total = sum(len(charset) ** i for i in range(1, max_length + 1))
-    tried = 0
-    for password in generate_passwords(charset, max_length):
-        tried += 1
-        if tried % 100 == 0:
-            self.update_state(state='PROGRESS', meta={'progress': int(tried / total * 100)})
-        time.sleep(0.01)
-        if password == "secret":
-            return password
-    return None
-
-def start_brute_force(hash_str, charset, max_length):
-    return brute_task.delay(hash_str, charset, max_length)
+def get_hasher(algorithm):
+    try:
+        return ALGORITHMS[algorithm.lower()]
+    except KeyError:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+
+def get_engine():
+    if settings.BRUTE_ENGINE == "blocks":
+        from app.services.brute_blocks import crack_blocks
+        return crack_blocks
+    return crack_positions
+
+def parse_targets(hashes, algorithm):
+    hasher = get_hasher(algorithm)
+    digests = set()
+    for hash_str in hashes:
+        digest = bytes.fromhex(hash_str)
+        if len(digest) != hasher().digest_size:
+            raise ValueError(f"Hash length does not match {algorithm}: {hash_str}")
+        digests.add(digest)
+    return hasher, digests
+
+def crack_many(hashes, attack, algorithm="md5", on_progress=None, start=0, stop=None, on_found=None):
+    # Один проход по пространству ключей сразу для всех целевых хешей
+    hasher, targets = parse_targets(hashes, algorithm)
+    keyspace = build_keyspace(attack)
+    if stop is None:
+        stop = keyspace.size
+    found = {}
+
+    def record(digest, candidate):
+        password = candidate.decode("utf-8", errors="replace")
+        found[digest.hex()] = password
+        if on_found:
+            on_found(digest.hex(), password)
+
+    keyspace.search(targets, hasher, start, stop, record, on_progress, get_engine())
+    return found
+
+def crack(hash_str, attack, algorithm="md5", on_progress=None, start=0, stop=None):
+    found = crack_many([hash_str], attack, algorithm, on_progress, start, stop)
+    return next(iter(found.values()), None)
+
+def split_keyspace(total, shard_size, max_shards):
+    count = max(1, min(max_shards, -(-total // shard_size)))
+    step = -(-total // count)
+    return [(start, min(start + step, total)) for start in range(0, total, step)]
+
+def split_ranges(ranges, parts):
+    # Режет список диапазонов на куски примерно равного размера
+    total = sum(stop - start for start, stop in ranges)
+    step = max(1, -(-total // parts))
+    slices = []
+    for start, stop in ranges:
+        for piece in range(start, stop, step):
+            slices.append([piece, min(piece + step, stop)])
+    return slices
+
+def _init_pool(stop_flag, tried, positions, found_queue):
+    global _pool_stop, _pool_tried, _pool_positions, _pool_found
+    _pool_stop = stop_flag
+    _pool_tried = tried
+    _pool_positions = positions
+    _pool_found = found_queue
+
+def _crack_pool_range(slot, hashes, attack, algorithm, start, stop):
+    pending = [0]
+    done = [0]
+
+    def flush():
+        with _pool_tried.get_lock():
+            _pool_tried.value += pending[0]
+        done[0] += pending[0]
+        _pool_positions[slot] = done[0]
+        pending[0] = 0
+
+    def on_progress(count):
+        # Общий счётчик под блокировкой, поэтому сбрасываем его пачками
+        pending[0] += count
+        if pending[0] < PROGRESS_STEP:
+            return False
+        flush()
+        return bool(_pool_stop.value)
+
+    crack_many(hashes, attack, algorithm, on_progress, start, stop,
+               on_found=lambda hash_str, password: _pool_found.put((hash_str, password)))
+    flush()
+    if not _pool_stop.value:
+        _pool_positions[slot] = stop - start
+
+def pool_size():
+    return settings.BRUTE_LOCAL_PROCESSES or os.cpu_count() or 1
+
+def crack_sequential(hashes, attack, algorithm, ranges, on_progress=None, on_found=None):
+    # ranges — оставшаяся работа; список обновляется на месте, поэтому
+    # в on_progress по нему всегда можно сохранить контрольную точку
+    found = {}
+    stopped = [False]
+
+    def track(count):
+        ranges[0][0] += count
+        stopped[0] = bool(on_progress and on_progress(count))
+        return stopped[0]
+
+    def record(hash_str, password):
+        found[hash_str] = password
+        if on_found:
+            on_found(hash_str, password)
+
+    while ranges and not stopped[0]:
+        pending = [hash_str for hash_str in hashes if hash_str not in found]
+        if not pending:
+            break
+        start, stop = ranges[0]
+        crack_many(pending, attack, algorithm, track, start, stop, record)
+        if stopped[0]:
+            break
+        ranges.pop(0)
+    return found
+
+def crack_parallel(hashes, attack, algorithm, ranges, processes, on_progress=None, on_found=None):
+    ctx = multiprocessing.get_context()
+    slices = split_ranges(ranges, processes)
+    stop_flag = ctx.Value("b", 0, lock=False)
+    tried = ctx.Value("q", 0)
+    positions = ctx.Array("Q", len(slices), lock=False)
+    found_queue = ctx.SimpleQueue()
+    targets = len(parse_targets(hashes, algorithm)[1])
+    reported = 0
+    found = {}
+
+    def drain():
+        while not found_queue.empty():
+            hash_str, password = found_queue.get()
+            found[hash_str] = password
+            if on_found:
+                on_found(hash_str, password)
+        if len(found) == targets:
+            stop_flag.value = 1
+
+    def remaining():
+        ranges[:] = [
+            [start + done, stop]
+            for (start, stop), done in zip(slices, positions)
+            if start + done < stop
+        ]
+
+    with ProcessPoolExecutor(processes, ctx, _init_pool, (stop_flag, tried, positions, found_queue)) as executor:
+        running = {
+            executor.submit(_crack_pool_range, slot, hashes, attack, algorithm, start, stop)
+            for slot, (start, stop) in enumerate(slices)
+        }
+        while running:
+            finished, running = wait(running, POOL_POLL_INTERVAL, FIRST_COMPLETED)
+            for future in finished:
+                future.result()
+            drain()
+            remaining()
+            current = tried.value
+            if on_progress and current > reported:
+                if on_progress(current - reported):
+                    stop_flag.value = 1
+                reported = current
+    drain()
+    remaining()
+    return found
+
+def _found_key(group_id):
+    return f"brute-found-{group_id}"
+
+def _pause_key(group_id):
+    return f"brute-paused-{group_id}"
+
+def _checkpoint_key(task_id):
+    return f"brute-checkpoint-{task_id}"
+
+def _job_key(group_id):
+    return f"brute-job-{group_id}"
+
+def redis_client(backend):
+    client = getattr(backend, "client", None)
+    return client if hasattr(client, "register_script") else None
+
+def _store(backend, key, value):
+    # Записи задания живут BRUTE_JOB_TTL_SECONDS с последнего обновления,
+    # а не result_expires бэкенда
+    client = redis_client(backend)
+    if client is None:
+        backend.set(key, value)
+    else:
+        client.set(key, value, ex=settings.BRUTE_JOB_TTL_SECONDS)
+
+def _touch(backend, group_id):
+    # Идущее задание продлевает свои записи на каждой контрольной точке
+    client = redis_client(backend)
+    if client is not None:
+        for key in (_job_key(group_id), _pause_key(group_id), backend.get_key_for_group(group_id)):
+            client.expire(key, settings.BRUTE_JOB_TTL_SECONDS)
+
+def load_checkpoint(backend, task_id):
+    data = backend.get(_checkpoint_key(task_id))
+    return json.loads(data) if data else None
+
+def attack_cache_key(attack):
+    # Для перебора по алфавиту порядок символов не важен: пустыми доказаны
+    # целые длины, поэтому ключ — отсортированный набор символов
+    if attack.get("mode", "charset") == "charset":
+        charset = "".join(sorted(set(attack["charset"])))
+        return json.dumps({"mode": "charset", "charset": charset}, sort_keys=True), attack["max_length"]
+    return json.dumps(attack, sort_keys=True), 0
+
+def cached_result(db, hash_str, attack, algorithm):
+    # (есть ли готовый ответ, пароль, индекс, с которого стоит начинать перебор)
+    cracked = hash_cache.get_cracked(db, algorithm, [hash_str])
+    if hash_str in cracked:
+        return True, cracked[hash_str], 0
+    key, max_length = attack_cache_key(attack)
+    exhausted = hash_cache.get_exhausted_length(db, algorithm, hash_str, key)
+    if exhausted is None:
+        return False, None, 0
+    if exhausted >= max_length:
+        return True, None, 0
+    # Длины идут по возрастанию, уже перебранные можно пропустить целиком
+    return False, None, sum(build_keyspace(attack).sizes[:exhausted])
+
+def save_cracked(algorithm, found):
+    if found:
+        with SessionLocal() as db:
+            hash_cache.save_cracked(db, algorithm, found)
+
+def record_exhausted(group_id):
+    # Вызывается воркером после каждого успешного шарда; пустые хеши
+    # записываются, когда успешно завершены все шарды задания
+    data = celery_app.backend.get(_job_key(group_id))
+    if not data:
+        return
+    metas = _shard_metas(group_id)
+    if not _all_successful(metas):
+        return
+    job = json.loads(data)
+    targets = job["targets"] if isinstance(job["targets"], list) else [job["targets"]]
+    found = set()
+    for meta in metas:
+        if isinstance(meta["result"], dict):
+            found.update(meta["result"])
+        elif meta["result"] is not None:
+            found.update(targets)
+    missing = [hash_str for hash_str in targets if hash_str not in found]
+    if missing:
+        key, max_length = attack_cache_key(job["attack"])
+        with SessionLocal() as db:
+            hash_cache.save_exhausted(db, job["algorithm"], missing, key, max_length)
+
+def _run_shard(task, hashes, attack, algorithm, start, stop, stop_key=None):
+    keyspace = build_keyspace(attack)
+    if stop is None:
+        stop = keyspace.size
+    backend = task.backend
+    group_id = task.request.group
+    # Перезапущенный или повторно доставленный шард продолжает с контрольной точки
+    checkpoint = load_checkpoint(backend, task.request.id) or {
+        "ranges": [[start, stop]], "tried": 0, "found": {},
+    }
+    ranges = checkpoint["ranges"]
+    found = checkpoint["found"]
+    now = time.monotonic()
+    progress = {
+        "tried": checkpoint["tried"], "checked": checkpoint["tried"], "reported": checkpoint["tried"],
+        "reported_at": now, "saved": now, "rate": 0.0,
+    }
+    paused = [False]
+    started, started_tried = now, progress["tried"]
+
+    def meta():
+        offset = ranges[0][0] if ranges else stop
+        rate = progress["rate"]
+        return {
+            'progress': int(progress["tried"] / (stop - start) * 100),
+            'tried': progress["tried"],
+            'total': stop - start,
+            'found': found,
+            'rate': int(rate),
+            'eta': round(sum(b - a for a, b in ranges) / rate, 1) if rate else None,
+            'offset': offset,
+            'current_length': len(keyspace.candidate(offset)) if offset < keyspace.size else None,
+        }
+
+    def save():
+        progress["saved"] = time.monotonic()
+        _store(backend, _checkpoint_key(task.request.id), json.dumps(
+            {"ranges": ranges, "tried": progress["tried"], "found": found}
+        ))
+        if group_id:
+            _touch(backend, group_id)
+
+    def report(now):
+        elapsed = now - progress["reported_at"]
+        if elapsed > 0:
+            progress["rate"] = (progress["tried"] - progress["reported"]) / elapsed
+        progress["reported"] = progress["tried"]
+        progress["reported_at"] = now
+        task.update_state(state='PROGRESS', meta=meta())
+        publish_event(task, "progress", meta())
+        if now - progress["saved"] >= settings.BRUTE_CHECKPOINT_SECONDS:
+            save()
+
+    def on_progress(count):
+        # Часы смотрим не на каждый префикс, а Redis трогаем не чаще
+        # BRUTE_PROGRESS_SECONDS, сколько бы кандидатов ни успело пройти
+        progress["tried"] += count
+        if progress["tried"] - progress["checked"] < PROGRESS_STEP:
+            return False
+        progress["checked"] = progress["tried"]
+        now = time.monotonic()
+        if now - progress["reported_at"] < settings.BRUTE_PROGRESS_SECONDS:
+            return False
+        report(now)
+        if group_id and backend.get(_pause_key(group_id)):
+            paused[0] = True
+            return True
+        # Другой шард уже нашёл пароль — дальше перебирать незачем
+        return bool(stop_key and backend.get(stop_key))
+
+    def on_found(hash_str, password):
+        found[hash_str] = password
+        save()
+        task.update_state(state='PROGRESS', meta=meta())
+        publish_event(task, "found", {"hash": hash_str, "password": password})
+
+    pending = [hash_str for hash_str in hashes if hash_str not in found]
+    if group_id and backend.get(_pause_key(group_id)):
+        paused[0] = True
+    elif pending and ranges:
+        processes = min(pool_size(), sum(b - a for a, b in ranges))
+        if processes > 1:
+            crack_parallel(pending, attack, algorithm, ranges, processes, on_progress, on_found)
+        else:
+            crack_sequential(pending, attack, algorithm, ranges, on_progress, on_found)
+    observe_shard(algorithm, progress["tried"] - started_tried, time.monotonic() - started)
+
+    if paused[0]:
+        save()
+        task.update_state(state=PAUSED, meta=meta())
+        publish_event(task, "paused", meta())
+        raise Ignore()
+    backend.delete(_checkpoint_key(task.request.id))
+    return found
+
+class BruteTask(celery_app.Task):
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        # Вызывается уже после записи результата, так что статус задания актуален
+        publish_event(self, "done", {"state": status})
+        if status == states.SUCCESS and self.request.group:
+            record_exhausted(self.request.group)
+
+@celery_app.task(bind=True, base=BruteTask, acks_late=True, reject_on_worker_lost=True)
+def brute_task(self, hash_str, attack, algorithm="md5", start=0, stop=None):
+    group_id = self.request.group
+    stop_key = _found_key(group_id) if group_id else None
+    found = _run_shard(self, [hash_str], attack, algorithm, start, stop, stop_key)
+    password = next(iter(found.values()), None)
+    save_cracked(algorithm, found)
+    if password is not None and group_id:
+        _store(self.backend, stop_key, password)
+        group_result = GroupResult.restore(group_id, app=celery_app)
+        if group_result:
+            for child in group_result.children:
+                if child.id != self.request.id:
+                    child.revoke()
+    return password
+
+@celery_app.task(bind=True, base=BruteTask, acks_late=True, reject_on_worker_lost=True)
+def brute_batch_task(self, hashes, attack, algorithm="md5", start=0, stop=None):
+    found = _run_shard(self, hashes, attack, algorithm, start, stop)
+    save_cracked(algorithm, found)
+    return found
+
+def _start_group(task, targets, attack, algorithm, offset=0, queue=None, owner=None, job_id=None):
+    total = build_keyspace(attack).size
+    ranges = [
+        (start + offset, stop + offset)
+        for start, stop in split_keyspace(total - offset, settings.BRUTE_SHARD_SIZE, settings.BRUTE_MAX_SHARDS)
+    ]
+    shards = group(
+        (task.s(targets, attack, algorithm, start, stop) for start, stop in ranges),
+        **({"task_id": job_id} if job_id else {}),
+    )
+    # id выдаются до отправки: описание задания и группа должны лежать в бэкенде
+    # раньше, чем последний шард закончит и запишет пустые хеши
+    job = shards.freeze()
+    job.save()
+    # Описание задания нужно, чтобы после паузы перезапустить шарды с теми же id
+    _store(celery_app.backend, _job_key(job.id), json.dumps({
+        "task": task.name,
+        "targets": targets,
+        "attack": attack,
+        "algorithm": algorithm,
+        "queue": queue,
+        "owner": owner,
+        "shards": [[child.id, start, stop] for child, (start, stop) in zip(job.children, ranges)],
+    }))
+    return shards.apply_async(queue=queue)
+
+def start_brute_force(hash_str, attack, algorithm="md5", offset=0, queue=None, owner=None, job_id=None):
+    return _start_group(brute_task, hash_str, attack, algorithm, offset, queue, owner, job_id)
+
+def start_batch_brute_force(hashes, attack, algorithm="md5", queue=None, owner=None, job_id=None):
+    return _start_group(brute_batch_task, list(hashes), attack, algorithm, queue=queue, owner=owner, job_id=job_id)
+
+def job_owner(task_id):
+    data = celery_app.backend.get(_job_key(task_id))
+    return json.loads(data).get("owner") if data else None
+
+def pause_job(task_id):
+    _store(celery_app.backend, _pause_key(task_id), "1")
+
+def resume_job(task_id):
+    data = celery_app.backend.get(_job_key(task_id))
+    if not data:
+        raise LookupError(f"Unknown job: {task_id}")
+    job = json.loads(data)
+    celery_app.backend.delete(_pause_key(task_id))
+    _touch(celery_app.backend, task_id)
+    task = celery_app.tasks[job["task"]]
+    resumed = 0
+    for shard_id, start, stop in job["shards"]:
+        if celery_app.AsyncResult(shard_id).status == PAUSED:
+            task.apply_async(
+                (job["targets"], job["attack"], job["algorithm"], start, stop),
+                task_id=shard_id, group_id=task_id, queue=job.get("queue"),
+            )
+            resumed += 1
+    return resumed
+
+def job_finished(task_id):
+    # Задание без записи истекло вместе со своими шардами
+    if not celery_app.backend.get(_job_key(task_id)):
+        return True
+    return all(meta["status"] in states.READY_STATES for meta in _shard_metas(task_id))
+
+def any_status(task_id):
+    data = celery_app.backend.get(_job_key(task_id))
+    if data and json.loads(data)["task"] == brute_batch_task.name:
+        return batch_status(task_id)
+    return job_status(task_id)
+
+def _shard_metas(task_id):
+    # Одно обращение к бэкенду на шард: у AsyncResult каждое свойство — отдельный запрос
+    job = GroupResult.restore(task_id, app=celery_app)
+    ids = [child.id for child in job.children] if job else [task_id]
+    return [celery_app.backend.get_task_meta(shard_id) for shard_id in ids]
+
+def _shard_progress(metas):
+    # Шарды примерно одинаковые, поэтому прогресс — среднее по долям шардов
+    done = 0
+    share = 0.0
+    rate = 0.0
+    remaining = 0
+    waiting = 0
+    totals = []
+    active = []
+    for meta in metas:
+        state, info = meta["status"], meta["result"]
+        if state in states.READY_STATES:
+            done += 1
+            share += 1
+        elif isinstance(info, dict) and info.get("total"):
+            share += info["tried"] / info["total"]
+            totals.append(info["total"])
+            remaining += info["total"] - info["tried"]
+            if state == "PROGRESS":
+                rate += info.get("rate", 0)
+                active.append({key: info.get(key) for key in ("offset", "current_length", "rate", "eta")})
+        else:
+            waiting += 1
+    if totals:
+        remaining += waiting * sum(totals) / len(totals)
+
+    statuses = {meta["status"] for meta in metas}
+    if done == len(metas):
+        status = "failure" if states.FAILURE in statuses else "success"
+    elif PAUSED in statuses and not statuses & {states.STARTED, "PROGRESS"}:
+        status = "paused"
+    elif statuses == {states.PENDING}:
+        status = "pending"
+    else:
+        status = "progress"
+    return {
+        "status": status,
+        "progress": int(share / len(metas) * 100),
+        "rate": int(rate),
+        "eta": round(remaining / rate, 1) if rate else None,
+        "shards": active,
+    }
+
+def _all_successful(metas):
+    return all(meta["status"] == states.SUCCESS for meta in metas)
+
+def job_status(task_id):
+    metas = _shard_metas(task_id)
+    summary = _shard_progress(metas)
+    password = next(
+        (meta["result"] for meta in metas if meta["status"] == states.SUCCESS and meta["result"] is not None),
+        None,
+    )
+    if password is not None:
+        return {**summary, "status": "success", "progress": 100, "eta": None, "result": password}
+    return {**summary, "result": None}
+
+def batch_status(task_id):
+    metas = _shard_metas(task_id)
+    summary = _shard_progress(metas)
+    found = {}
+    for meta in metas:
+        if meta["status"] == states.SUCCESS:
+            found.update(meta["result"] or {})
+        elif isinstance(meta["result"], dict):
+            found.update(meta["result"].get("found", {}))
+    return {**summary, "found": found}
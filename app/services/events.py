@@ -0,0 +1,113 @@
+import asyncio
+import json
+from app.core.celery_app import celery_app
+
+EVENTS_CHANNEL = "brute-events"
+QUEUE_SIZE = 100
+RECONNECT_SECONDS = 1.0
+
+def publish_event(task, kind, data):
+    # Шарды публикуют события через клиент Redis result backend'а;
+    # у других бэкендов pub/sub нет, и тогда остаётся только опрос
+    client = getattr(task.backend, "client", None)
+    if not hasattr(client, "publish"):
+        return
+    client.publish(EVENTS_CHANNEL, json.dumps({
+        "job_id": task.request.group or task.request.id,
+        "shard": task.request.id,
+        "type": kind,
+        "data": data,
+    }))
+
+class EventHub:
+    # Одна подписка на канал на весь процесс, события раздаются по очередям клиентов
+    def __init__(self):
+        self._subscribers = {}
+        self._listener = None
+        self._refreshing = {}  # id задания -> нужен ли ещё один пересчёт статуса
+        self._tasks = set()
+
+    def subscribe(self, job_id):
+        queue = asyncio.Queue(QUEUE_SIZE)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        return queue
+
+    def unsubscribe(self, job_id, queue):
+        queues = self._subscribers.get(job_id)
+        if queues:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[job_id]
+
+    def _broadcast(self, job_id, event):
+        for queue in self._subscribers.get(job_id, ()):
+            # Медленный клиент теряет старые события, а не тормозит остальных
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def _request_refresh(self, job_id):
+        # Сводный статус считается один раз на задание, а не на каждого клиента;
+        # события, пришедшие во время подсчёта, дают ещё один проход
+        if job_id in self._refreshing:
+            self._refreshing[job_id] = True
+            return
+        self._refreshing[job_id] = False
+        task = asyncio.create_task(self._refresh(job_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, job_id):
+        from app.services.brute_service import any_status
+        loop = asyncio.get_running_loop()
+        try:
+            while job_id in self._subscribers:
+                self._refreshing[job_id] = False
+                status = await loop.run_in_executor(None, any_status, job_id)
+                self._broadcast(job_id, {"job_id": job_id, "type": "status", "data": status})
+                if not self._refreshing[job_id]:
+                    break
+        finally:
+            del self._refreshing[job_id]
+
+    async def _listen(self):
+        # Слушатель не завершается: иначе клиент, подписавшийся во время его
+        # остановки, остался бы без событий. Оборванное соединение переоткрывается
+        import redis.asyncio as aioredis
+        from redis.exceptions import RedisError
+        reconnected = False
+        while True:
+            client = pubsub = None
+            try:
+                client = aioredis.from_url(celery_app.conf.result_backend)
+                pubsub = client.pubsub()
+                await pubsub.subscribe(EVENTS_CHANNEL)
+                if reconnected:
+                    # Пока связи не было, события могли потеряться
+                    for job_id in list(self._subscribers):
+                        self._request_refresh(job_id)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    event = json.loads(message["data"])
+                    job_id = event["job_id"]
+                    if job_id not in self._subscribers:
+                        continue
+                    self._broadcast(job_id, event)
+                    if event["type"] in ("done", "paused"):
+                        self._request_refresh(job_id)
+            except (RedisError, OSError):
+                reconnected = True
+                await asyncio.sleep(RECONNECT_SECONDS)
+            finally:
+                try:
+                    if pubsub is not None:
+                        await pubsub.aclose()
+                    if client is not None:
+                        await client.aclose()
+                except (RedisError, OSError):
+                    pass
+
+hub = EventHub()
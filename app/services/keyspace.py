@@ -0,0 +1,218 @@
+from math import prod
+import string
+
+MASK_CHARSETS = {
+    "l": string.ascii_lowercase,
+    "u": string.ascii_uppercase,
+    "d": string.digits,
+    "s": " " + string.punctuation,
+    "a": string.ascii_lowercase + string.ascii_uppercase + string.digits + " " + string.punctuation,
+    "?": "?",
+}
+
+RULE_ARITY = {":": 0, "l": 0, "u": 0, "c": 0, "r": 0, "d": 0, "[": 0, "]": 0, "$": 1, "^": 1, "s": 2}
+
+def charset_symbols(charset):
+    # Один символ — один байт, чтобы кандидат менялся прямо в bytearray
+    symbols = bytes(dict.fromkeys(charset.encode("ascii")))
+    if not symbols:
+        raise ValueError("Charset is empty")
+    return symbols
+
+def parse_mask(mask):
+    positions = []
+    i = 0
+    while i < len(mask):
+        if mask[i] == "?":
+            key = mask[i + 1:i + 2]
+            if key not in MASK_CHARSETS:
+                raise ValueError(f"Unknown mask placeholder at position {i}: ?{key}")
+            positions.append(charset_symbols(MASK_CHARSETS[key]))
+            i += 2
+        else:
+            positions.append(charset_symbols(mask[i]))
+            i += 1
+    if not positions:
+        raise ValueError("Mask is empty")
+    return positions
+
+def parse_rule(rule):
+    ops = []
+    i = 0
+    while i < len(rule):
+        op = rule[i]
+        if op == " ":
+            i += 1
+            continue
+        if op not in RULE_ARITY:
+            raise ValueError(f"Unknown rule function {op!r} in {rule!r}")
+        args = rule[i + 1:i + 1 + RULE_ARITY[op]]
+        if len(args) < RULE_ARITY[op]:
+            raise ValueError(f"Rule function {op!r} is missing arguments in {rule!r}")
+        ops.append((op, args.encode("utf-8")))
+        i += 1 + RULE_ARITY[op]
+    return ops
+
+def apply_rule(ops, word):
+    for op, args in ops:
+        if op == "l":
+            word = word.lower()
+        elif op == "u":
+            word = word.upper()
+        elif op == "c":
+            word = word.capitalize()
+        elif op == "r":
+            word = word[::-1]
+        elif op == "d":
+            word = word + word
+        elif op == "[":
+            word = word[1:]
+        elif op == "]":
+            word = word[:-1]
+        elif op == "$":
+            word = word + args
+        elif op == "^":
+            word = args + word
+        elif op == "s":
+            word = word.replace(args[:1], args[1:])
+    return word
+
+def _digits(value, radix):
+    indices = [0] * len(radix)
+    for pos in range(len(radix) - 1, -1, -1):
+        value, indices[pos] = divmod(value, radix[pos])
+    return indices
+
+def crack_positions(targets, positions, hasher, on_found, on_progress=None, start=0, stop=None):
+    # Последняя позиция перебирается во внутреннем цикле: префикс хешируется
+    # один раз, а для каждого кандидата копируется готовое состояние хешера.
+    # Возвращает True, когда перебор пора остановить
+    radix = [len(symbols) for symbols in positions]
+    if stop is None:
+        stop = prod(radix)
+    if start >= stop:
+        return False
+    head = positions[:-1]
+    tails = [bytes((s,)) for s in positions[-1]]
+    n = radix[-1]
+
+    first, first_tail = divmod(start, n)
+    last, last_tail = divmod(stop - 1, n)
+    indices = _digits(first, radix[:-1])
+    prefix = bytearray(symbols[i] for symbols, i in zip(head, indices))
+    for p in range(first, last + 1):
+        lo = first_tail if p == first else 0
+        hi = last_tail + 1 if p == last else n
+        base = hasher(prefix)
+        for tail in tails[lo:hi]:
+            h = base.copy()
+            h.update(tail)
+            digest = h.digest()
+            if digest in targets:
+                targets.discard(digest)
+                on_found(digest, bytes(prefix) + tail)
+                if not targets:
+                    return True
+        if on_progress and on_progress(hi - lo):
+            return True
+
+        pos = len(head) - 1
+        while pos >= 0:
+            indices[pos] += 1
+            if indices[pos] < radix[pos]:
+                prefix[pos] = head[pos][indices[pos]]
+                break
+            indices[pos] = 0
+            prefix[pos] = head[pos][0]
+            pos -= 1
+    return False
+
+class PositionalKeyspace:
+    # Пространство из сегментов; сегмент — список алфавитов по позициям
+    def __init__(self, segments):
+        self.segments = segments
+        self.sizes = [prod(len(symbols) for symbols in positions) for positions in segments]
+        self.size = sum(self.sizes)
+
+    def candidate(self, index):
+        for positions, size in zip(self.segments, self.sizes):
+            if index < size:
+                indices = _digits(index, [len(symbols) for symbols in positions])
+                return bytes(symbols[i] for symbols, i in zip(positions, indices))
+            index -= size
+        raise IndexError("Candidate index out of keyspace")
+
+    def search(self, targets, hasher, start, stop, on_found, on_progress=None, engine=crack_positions):
+        offset = 0
+        for positions, size in zip(self.segments, self.sizes):
+            lo = max(start, offset) - offset
+            hi = min(stop, offset + size) - offset
+            offset += size
+            if lo < hi and engine(targets, positions, hasher, on_found, on_progress, lo, hi):
+                return True
+        return False
+
+class DictionaryKeyspace:
+    # Кандидат с индексом i — слово i // len(rules), изменённое правилом i % len(rules)
+    def __init__(self, words, rules):
+        self.words = [word.encode("utf-8") for word in words]
+        self.rules = [parse_rule(rule) for rule in rules or [":"]]
+        self.size = len(self.words) * len(self.rules)
+
+    def candidate(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError("Candidate index out of keyspace")
+        word, rule = divmod(index, len(self.rules))
+        return apply_rule(self.rules[rule], self.words[word])
+
+    def search(self, targets, hasher, start, stop, on_found, on_progress=None, engine=None):
+        if start >= stop:
+            return False
+        count = len(self.rules)
+        first, first_rule = divmod(start, count)
+        last, last_rule = divmod(stop - 1, count)
+        for w in range(first, last + 1):
+            lo = first_rule if w == first else 0
+            hi = last_rule + 1 if w == last else count
+            word = self.words[w]
+            for ops in self.rules[lo:hi]:
+                candidate = apply_rule(ops, word)
+                digest = hasher(candidate).digest()
+                if digest in targets:
+                    targets.discard(digest)
+                    on_found(digest, candidate)
+                    if not targets:
+                        return True
+            if on_progress and on_progress(hi - lo):
+                return True
+        return False
+
+class CharsetKeyspace(PositionalKeyspace):
+    # Все строки длиной 1..max_length из одного алфавита: хранится только алфавит,
+    # сегмент строится на лету, размеры — степени числа символов
+    def __init__(self, symbols, max_length):
+        self.symbols = symbols
+        self.lengths = range(1, max_length + 1)
+        self.sizes = [len(symbols) ** length for length in self.lengths]
+        n = len(symbols)
+        self.size = (n ** (max_length + 1) - n) // (n - 1) if n > 1 else max_length
+
+    @property
+    def segments(self):
+        return ([self.symbols] * length for length in self.lengths)
+
+def charset_keyspace(charset, max_length):
+    return CharsetKeyspace(charset_symbols(charset), max_length)
+
+def mask_keyspace(mask):
+    return PositionalKeyspace([parse_mask(mask)])
+
+def build_keyspace(attack):
+    mode = attack.get("mode", "charset")
+    if mode == "charset":
+        return charset_keyspace(attack["charset"], attack["max_length"])
+    if mode == "mask":
+        return mask_keyspace(attack["mask"])
+    if mode == "dictionary":
+        return DictionaryKeyspace(attack["words"], attack.get("rules"))
+    raise ValueError(f"Unsupported attack mode: {mode}")
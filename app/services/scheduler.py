@@ -0,0 +1,126 @@
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.services.brute_service import job_finished, redis_client, split_keyspace
+from app.services.keyspace import build_keyspace
+from celery.utils import uuid
+import threading
+import time
+
+SMALL_QUEUE = "brute-small"
+MEDIUM_QUEUE = "brute-medium"
+LARGE_QUEUE = "brute-large"
+QUEUES = (SMALL_QUEUE, MEDIUM_QUEUE, LARGE_QUEUE)
+
+# KEYS[1] — задания пользователя с временем резервирования, ARGV — id задания,
+# лимит, текущее время и срок жизни ключа
+RESERVE_JOB_SCRIPT = """
+if redis.call("ZCARD", KEYS[1]) >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call("ZADD", KEYS[1], ARGV[3], ARGV[1])
+redis.call("EXPIRE", KEYS[1], ARGV[4])
+return 1
+"""
+
+# Столько секунд у только что зарезервированного задания может ещё не быть
+# записи в бэкенде: до этого оно не считается завершённым
+RESERVE_GRACE_SECONDS = 60
+
+# Для бэкендов без Redis (eager-режим, тесты) — словари в памяти процесса
+_local_jobs = {}
+_local_lock = threading.Lock()
+
+# Относительная цена одного кандидата по сравнению с md5
+ALGORITHM_COST = {"md5": 1.0, "sha1": 1.1, "sha256": 1.5, "sha512": 2.0}
+
+class AdmissionError(Exception):
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def estimate_cost(attack, algorithm, offset=0):
+    return (build_keyspace(attack).size - offset) * ALGORITHM_COST[algorithm]
+
+def shard_seconds(attack, algorithm, offset=0):
+    # Ожидаемое время самого долгого шарда при разбиении, как в _start_group
+    ranges = split_keyspace(build_keyspace(attack).size - offset, settings.BRUTE_SHARD_SIZE, settings.BRUTE_MAX_SHARDS)
+    return max(stop - start for start, stop in ranges) * ALGORITHM_COST[algorithm] / settings.BRUTE_SHARD_RATE
+
+def pick_queue(cost):
+    if cost <= settings.BRUTE_SMALL_JOB_COST:
+        return SMALL_QUEUE
+    if cost <= settings.BRUTE_MEDIUM_JOB_COST:
+        return MEDIUM_QUEUE
+    return LARGE_QUEUE
+
+def _jobs_key(owner):
+    return f"brute-user-jobs-{owner}"
+
+def _redis():
+    return redis_client(celery_app.backend)
+
+def active_jobs(owner):
+    # Завершённые и истёкшие задания вычёркиваются по одному через ZREM,
+    # поэтому задание, только что добавленное другим запросом, не пропадёт
+    key = _jobs_key(owner)
+    client = _redis()
+    if client is None:
+        with _local_lock:
+            jobs = dict(_local_jobs.get(key, {}))
+    else:
+        jobs = {job_id.decode(): reserved_at for job_id, reserved_at in client.zrange(key, 0, -1, withscores=True)}
+    now = time.time()
+    finished = [
+        job_id for job_id, reserved_at in jobs.items()
+        if now - reserved_at > RESERVE_GRACE_SECONDS and job_finished(job_id)
+    ]
+    if finished:
+        if client is None:
+            with _local_lock:
+                for job_id in finished:
+                    _local_jobs[key].pop(job_id, None)
+        else:
+            client.zrem(key, *finished)
+    return set(jobs).difference(finished)
+
+def reserve_job(owner):
+    # Проверка лимита и запись нового задания — один шаг: два параллельных
+    # запроса одного пользователя не пройдут лимит оба
+    active_jobs(owner)
+    key = _jobs_key(owner)
+    job_id = uuid()
+    client = _redis()
+    if client is None:
+        with _local_lock:
+            jobs = _local_jobs.setdefault(key, {})
+            reserved = len(jobs) < settings.BRUTE_USER_MAX_JOBS
+            if reserved:
+                jobs[job_id] = time.time()
+    else:
+        reserved = client.register_script(RESERVE_JOB_SCRIPT)(
+            keys=[key], args=[job_id, settings.BRUTE_USER_MAX_JOBS, time.time(), settings.BRUTE_JOB_TTL_SECONDS],
+        )
+    if not reserved:
+        raise AdmissionError(429, f"Too many running jobs, the limit is {settings.BRUTE_USER_MAX_JOBS}")
+    return job_id
+
+def release_job(owner, job_id):
+    # Задание так и не запустилось — место в лимите освобождается
+    client = _redis()
+    if client is None:
+        with _local_lock:
+            _local_jobs.get(_jobs_key(owner), {}).pop(job_id, None)
+    else:
+        client.zrem(_jobs_key(owner), job_id)
+
+def admit(owner, attack, algorithm, offset=0):
+    # Решает, пускать ли задание; возвращает очередь для его шардов и id задания
+    cost = estimate_cost(attack, algorithm, offset)
+    if cost > settings.BRUTE_MAX_JOB_COST:
+        raise AdmissionError(413, f"Job cost {cost:.3g} exceeds the budget of {settings.BRUTE_MAX_JOB_COST:.3g}")
+    # Шард дольше таймаута видимости брокер выдал бы повторно, пока идёт первый
+    seconds = shard_seconds(attack, algorithm, offset)
+    if seconds > settings.BRUTE_MAX_SHARD_SECONDS:
+        raise AdmissionError(413, f"Job shards would run about {seconds:.0f}s, the limit is {settings.BRUTE_MAX_SHARD_SECONDS:.0f}s")
+    return pick_queue(cost), reserve_job(owner)
@@ -0,0 +1,170 @@
+from concurrent.futures import ProcessPoolExecutor
+from pydantic import ValidationError
+import asyncio
+import csv
+import io
+import json
+import os
+from app.core.config import settings
+from app.core.security import apply_password_policy, get_pwd_context, password_policy
+from app.cruds import user as user_crud
+from app.db.session import AsyncSessionLocal
+from app.schemas.auth import UserImportRecord
+
+_pool = None
+# Незакрытая кавычка не должна склеить в одну запись весь остаток файла
+MAX_RECORD_CHARS = 64 * 1024
+
+def _hash_workers():
+    return settings.USER_IMPORT_HASH_PROCESSES or os.cpu_count()
+
+def _hash_pool():
+    # bcrypt на сотнях тысяч паролей упирается в CPU, поэтому пул процессов,
+    # а не потоков; создаётся только при первом импорте открытых паролей
+    global _pool
+    if _pool is None:
+        # Процессы получают ту же откалиброванную политику, что и API
+        _pool = ProcessPoolExecutor(_hash_workers(), initializer=apply_password_policy, initargs=(password_policy(),))
+    return _pool
+
+def _hash_passwords(passwords):
+    return [get_pwd_context().hash(password) for password in passwords]
+
+async def _hash_all(passwords):
+    if not passwords:
+        return []
+    pool = _hash_pool()
+    step = -(-len(passwords) // _hash_workers())
+    loop = asyncio.get_running_loop()
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(pool, _hash_passwords, passwords[i:i + step])
+        for i in range(0, len(passwords), step)
+    ))
+    return [hashed for part in parts for hashed in part]
+
+async def iter_lines(chunks):
+    # Строки отдаются байтами: битая кодировка — ошибка одной строки, а не всего импорта
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+async def iter_records(chunks, fmt, result):
+    # (номер первой строки, текст записи). Запись CSV продолжается на следующих
+    # строках, пока поле в кавычках не закрыто: конец записи определяет сам csv
+    pending = ""
+    start = number = 0
+    async for raw in iter_lines(chunks):
+        number += 1
+        try:
+            line = raw.decode("utf-8")
+        except UnicodeDecodeError as exc:
+            _error(result, number, exc)
+            pending = ""
+            continue
+        if fmt != "csv":
+            yield number, line.rstrip("\r")
+            continue
+        if not pending:
+            start = number
+        pending += line + "\n"
+        try:
+            list(csv.reader([pending], strict=True))
+        except csv.Error as exc:
+            if "unexpected end of data" in str(exc) and len(pending) < MAX_RECORD_CHARS:
+                continue
+        yield start, pending
+        pending = ""
+    if pending:
+        yield start, pending
+
+def _error(result, number, exc):
+    if len(result["errors"]) >= settings.USER_IMPORT_MAX_ERRORS:
+        return
+    if isinstance(exc, ValidationError):
+        detail = "; ".join(error["msg"] for error in exc.errors())
+    else:
+        detail = str(exc)
+    result["errors"].append({"line": number, "detail": detail})
+
+def _csv_row(text):
+    rows = list(csv.reader([text], strict=True))
+    if len(rows) != 1:
+        raise ValueError("Expected one CSV record")
+    return rows[0]
+
+def _parse(fmt, line, header):
+    if fmt == "csv":
+        row = _csv_row(line)
+        data = {name: value for name, value in zip(header, row) if value != ""}
+    else:
+        data = json.loads(line)
+    record = UserImportRecord.model_validate(data)
+    if record.hashed_password is not None and get_pwd_context().identify(record.hashed_password, required=False) is None:
+        raise ValueError("hashed_password has an unsupported format")
+    return record
+
+async def _flush(db, batch, result):
+    existing = await user_crud.existing_emails_async(db, list(batch))
+    records = [record for email, record in batch.items() if email not in existing]
+    result["skipped"] += len(batch) - len(records)
+    plain = [record for record in records if record.hashed_password is None]
+    for record, hashed in zip(plain, await _hash_all([record.password for record in plain])):
+        record.hashed_password = hashed
+    if records:
+        await user_crud.insert_users_async(
+            db, [{"email": record.email, "hashed_password": record.hashed_password} for record in records]
+        )
+    result["imported"] += len(records)
+
+async def import_users(db, chunks, fmt):
+    # Строки читаются потоком и пишутся пачками: в памяти не больше одной пачки
+    result = {"imported": 0, "skipped": 0, "errors": []}
+    batch = {}
+    header = None
+    async for number, line in iter_records(chunks, fmt, result):
+        if not line.strip():
+            continue
+        try:
+            if fmt == "csv" and header is None:
+                header = [name.strip() for name in _csv_row(line)]
+                continue
+            record = _parse(fmt, line, header)
+        except (ValueError, TypeError, csv.Error) as exc:
+            _error(result, number, exc)
+            continue
+        if record.email in batch:
+            result["skipped"] += 1
+            continue
+        batch[record.email] = record
+        if len(batch) >= settings.USER_IMPORT_BATCH_SIZE:
+            await _flush(db, batch, result)
+            batch = {}
+    if batch:
+        await _flush(db, batch, result)
+    return result
+
+def _format_rows(fmt, rows):
+    if fmt == "csv":
+        out = io.StringIO()
+        csv.writer(out, lineterminator="\n").writerows(rows)
+        return out.getvalue()
+    return "".join(json.dumps({"email": email, "hashed_password": hashed}) + "\n" for email, hashed in rows)
+
+async def export_users(fmt):
+    # Своя сессия: генератор работает уже после выхода из обработчика запроса
+    if fmt == "csv":
+        yield "email,hashed_password\n"
+    async with AsyncSessionLocal() as db:
+        rows = []
+        async for row in user_crud.stream_users_async(db, settings.USER_IMPORT_BATCH_SIZE):
+            rows.append(tuple(row))
+            if len(rows) >= settings.USER_IMPORT_BATCH_SIZE:
+                yield _format_rows(fmt, rows)
+                rows = []
+        if rows:
+            yield _format_rows(fmt, rows)
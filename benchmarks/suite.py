@@ -0,0 +1,186 @@
+"""Бенчмарки движка перебора.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --compare bench.json
+
+Результаты пишутся в JSON, чтобы сравнивать коммиты между собой:
+--compare печатает отношение к сохранённому прогону и завершается
+с кодом 1, если какой-то замер просел сильнее --tolerance.
+Набор startup завершается с кодом 1, если приложение добавляет к холодному
+старту больше --startup-budget секунд сверх импорта FastAPI и SQLAlchemy.
+"""
+import argparse
+import hashlib
+import json
+import platform
+import subprocess
+import sys
+import time
+
+from app.core.celery_app import celery_app
+from app.services.brute_blocks import generate_blocks, crack_blocks
+from app.services.brute_service import ALGORITHMS, generate_passwords
+from app.services.keyspace import charset_symbols, crack_positions
+
+LOWER = "abcdefghijklmnopqrstuvwxyz"
+ALNUM = LOWER + LOWER.upper() + "0123456789"
+MISSING = "00" * 64
+
+# Новый процесс импортирует приложение и проходит lifespan до приёма запросов
+STARTUP_SCRIPT = """
+import asyncio, os
+import main
+
+async def serve():
+    async with main.app.router.lifespan_context(main.app):
+        os._exit(0)
+
+asyncio.run(serve())
+"""
+
+# Без этих библиотек API не поднять; их импорт — пол, от которого считается бюджет
+FRAMEWORKS_SCRIPT = "import fastapi, sqlalchemy.orm, sqlalchemy.ext.asyncio"
+
+def _measure(func, repeat):
+    # Лучший из нескольких прогонов меньше всего зависит от шума машины
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def _positions(charset, length):
+    return [charset_symbols(charset)] * length
+
+def bench_generation(repeat):
+    positions = _positions(LOWER, 5)
+    count = len(LOWER) ** 5
+    # generate_passwords идёт по всем длинам 1..5
+    total = sum(len(LOWER) ** i for i in range(1, 6))
+    yield "generate_passwords", total, _measure(lambda: sum(1 for _ in generate_passwords(LOWER, 5)), repeat)
+    yield "generate_blocks", count, _measure(lambda: sum(1 for _ in generate_blocks(positions)), repeat)
+
+def bench_hashing(repeat):
+    positions = _positions(LOWER, 4)
+    count = len(LOWER) ** 4
+    for name, hasher in ALGORITHMS.items():
+        missing = {bytes(hasher().digest_size)}
+        yield f"prefix_engine_{name}", count, _measure(
+            lambda: crack_positions(set(missing), positions, hasher, lambda *args: None), repeat
+        )
+        yield f"block_engine_{name}", count, _measure(
+            lambda: crack_blocks(set(missing), positions, hasher, lambda *args: None), repeat
+        )
+
+def bench_scaling(repeat):
+    for charset_name, charset, lengths in (("lower", LOWER, (3, 4)), ("alnum", ALNUM, (2, 3))):
+        for length in lengths:
+            positions = _positions(charset, length)
+            count = len(charset) ** length
+            yield f"scaling_{charset_name}_len{length}", count, _measure(
+                lambda: crack_positions({bytes(16)}, positions, hashlib.md5, lambda *args: None), repeat
+            )
+
+def bench_task(repeat):
+    # Задача целиком, включая трассировку Celery, прогресс и чекпоинты,
+    # но без брокера: eager-режим и результаты в памяти
+    from app.services.brute_service import brute_task
+    celery_app.conf.update(task_always_eager=True, result_backend="cache+memory://", broker_url="memory://")
+    attack = {"mode": "charset", "charset": LOWER, "max_length": 4}
+    count = sum(len(LOWER) ** i for i in range(1, 5))
+    yield "brute_task_eager_md5", count, _measure(lambda: brute_task.apply((MISSING[:32], attack, "md5")), repeat)
+
+def bench_startup(repeat):
+    def start(script):
+        subprocess.run([sys.executable, "-c", script], check=True)
+    yield "startup_frameworks", 1, _measure(lambda: start(FRAMEWORKS_SCRIPT), repeat)
+    yield "startup_api", 1, _measure(lambda: start(STARTUP_SCRIPT), repeat)
+
+SUITES = {
+    "generation": bench_generation,
+    "hashing": bench_hashing,
+    "scaling": bench_scaling,
+    "task": bench_task,
+    "startup": bench_startup,
+}
+
+# Эти наборы меряют время, а не скорость перебора
+TIMED_SUITES = {"startup"}
+
+def _commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(suites, repeat):
+    results = {}
+    for suite in suites:
+        for name, count, seconds in SUITES[suite](repeat):
+            results[name] = {"count": count, "seconds": round(seconds, 6), "rate": round(count / seconds)}
+            if suite in TIMED_SUITES:
+                print(f"{name:<32} {seconds:>14.3f} s")
+            else:
+                print(f"{name:<32} {count / seconds:>14,.0f} candidates/s")
+    return {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+def compare(current, baseline, tolerance):
+    regressed = False
+    print(f"\n{'benchmark':<32} {'baseline':>14} {'current':>14} {'ratio':>7}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        ratio = result["rate"] / before["rate"]
+        mark = ""
+        if ratio < 1 - tolerance:
+            regressed = True
+            mark = "  REGRESSION"
+        print(f"{name:<32} {before['rate']:>14,} {result['rate']:>14,} {ratio:>7.2f}{mark}")
+    return regressed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES), help="run only these suites")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="JSON file of a previous run")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative slowdown")
+    parser.add_argument(
+        "--startup-budget", type=float, default=0.3,
+        help="max time the API adds to a cold start over importing its frameworks, seconds",
+    )
+    args = parser.parse_args(argv)
+
+    current = run(args.suite or list(SUITES), args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+    failed = False
+    results = current["results"]
+    if "startup_api" in results:
+        # Абсолютное время зависит от машины, поэтому бюджет — только на то,
+        # что добавляет само приложение: свои модули, роутеры и lifespan
+        overhead = results["startup_api"]["seconds"] - results["startup_frameworks"]["seconds"]
+        if overhead > args.startup_budget:
+            print(f"\nstartup_api adds {overhead:.3f}s over its frameworks, budget is {args.startup_budget}s")
+            failed = True
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        failed = compare(current, baseline, args.tolerance) or failed
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
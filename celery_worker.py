@@ -1,4 +1,8 @@
+import sys
 from app.core.celery_app import celery_app
+from app.services.scheduler import QUEUES
 
 if __name__ == "__main__":
-    celery_app.worker_main(["worker", "--loglevel=info", "--pool=solo"])
\ No newline at end of file
+    # Можно поднять отдельный воркер под часть очередей: python celery_worker.py brute-small
+    queues = ",".join(sys.argv[1:] or QUEUES)
+    celery_app.worker_main(["worker", "--loglevel=info", "--pool=solo", f"--queues={queues}"])
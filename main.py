@@ -1,11 +1,30 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.api import auth, brute
-from app.db.base import Base
-from app.db.session import engine
+from app.api import auth, brute, users, metrics
+from app.core.security import calibrate_password_policy
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.metrics import MetricsMiddleware
+from app.core.config import settings
+import asyncio
 
-Base.metadata.create_all(bind=engine)
+# Схема базы создаётся только миграциями: alembic upgrade head
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    # Калибровка хеширования идёт в фоне и не задерживает приём запросов;
+    # до её конца действует стоимость из настроек
+    app.state.calibration = asyncio.get_running_loop().run_in_executor(None, calibrate_password_policy)
+    yield
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(RateLimitMiddleware)
+# Последний добавленный слой внешний: в метрики попадают и отказы лимитера
+app.add_middleware(MetricsMiddleware)
+if settings.PROFILING_ENABLED:
+    from app.core.profiling import ProfilerMiddleware
+    app.add_middleware(ProfilerMiddleware)
 
 app.include_router(auth.router)
 app.include_router(brute.router)
+app.include_router(users.router)
+app.include_router(metrics.router)
@@ -5,11 +5,34 @@ import numpy as np
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QLabel, QSlider, QSpinBox, QPushButton, QWidget
 )
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QTimer, QElapsedTimer
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.lines import Line2D
 import matplotlib.pyplot as plt
 
 g = 9.81
+TRAJECTORY_POINTS = 500
+FRAME_INTERVAL_MS = 20
+# Полёт показывается за одно и то же время при любом числе точек:
+# если кадр опоздал, анимация перескакивает вперёд, а не замедляется
+ANIMATION_MS = TRAJECTORY_POINTS * FRAME_INTERVAL_MS
+
+
+class Flight:
+    # Запущенный снаряд: траектория, её линия и сколько точек уже нарисовано
+    def __init__(self, x, y, line, started):
+        self.x = x
+        self.y = y
+        self.line = line
+        self.started = started
+        self.shown = 0
+
+    def index_at(self, now):
+        return min(len(self.x) * (now - self.started) // ANIMATION_MS, len(self.x) - 1)
+
+    def finished(self):
+        return self.shown == len(self.x) - 1
+
 
 class ProjectileSimulation(QMainWindow):
     def __init__(self):
@@ -19,10 +42,11 @@ class ProjectileSimulation(QMainWindow):
 
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_animation)
+        self.clock = QElapsedTimer()
+        self.clock.start()
 
-        self.time_elapsed = 0
-        self.x_data = []
-        self.y_data = []
+        self.flights = []
+        self.background = None
 
         self.init_ui()
 
@@ -35,6 +59,14 @@ class ProjectileSimulation(QMainWindow):
         self.canvas = FigureCanvas(self.figure)
         layout.addWidget(self.canvas)
 
+        # Артисты создаются один раз и дальше только получают новые данные;
+        # animated=True исключает их из обычной перерисовки фигуры
+        self.heads = self.ax.scatter([], [], color="blue", label="Снаряд", animated=True, zorder=3)
+        self.ax.legend(handles=[Line2D([], [], color="red", label="Траектория"), self.heads])
+        self.ax.set_xlabel("Расстояние (м)")
+        self.ax.set_ylabel("Высота (м)")
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+
         controls_layout = QHBoxLayout()
 
         controls_layout.addWidget(QLabel("Начальная скорость (м/с):"))
@@ -69,43 +101,68 @@ class ProjectileSimulation(QMainWindow):
         v0 = self.v0_spinbox.value()
         angle = np.radians(self.angle_slider.value())
         t_flight = 2 * v0 * np.sin(angle) / g  # Время полета
-        t = np.linspace(0, t_flight, num=500)
+        t = np.linspace(0, t_flight, num=TRAJECTORY_POINTS)
 
         x = v0 * np.cos(angle) * t
         y = v0 * np.sin(angle) * t - 0.5 * g * t**2
         return x, y
 
+    def on_draw(self, event):
+        # Полная перерисовка (масштаб, размер окна) стирает нарисованные траектории:
+        # они рисуются заново один раз и запоминаются в фоне вместе с осями
+        for flight in self.flights:
+            flight.line.set_data(flight.x[: flight.shown + 1], flight.y[: flight.shown + 1])
+            self.ax.draw_artist(flight.line)
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.heads)
+
+    def clear_flights(self):
+        for flight in self.flights:
+            flight.line.remove()
+        self.flights = []
+        self.heads.set_offsets(np.empty((0, 2)))
+
     def start_animation(self):
-        self.x_data, self.y_data = self.calculate_trajectory()
+        x, y = self.calculate_trajectory()
 
-        if len(self.x_data) == 0 or len(self.y_data) == 0:
+        if len(x) == 0 or len(y) == 0:
             return
 
-        self.ax.clear()
-        self.ax.set_xlim(0, max(self.x_data) * 1.1)
-        self.ax.set_ylim(0, max(self.y_data) * 1.1)
-        self.ax.set_xlabel("Расстояние (м)")
-        self.ax.set_ylabel("Высота (м)")
+        # Пока летят прежние снаряды, новый добавляется к ним
+        if not self.timer.isActive():
+            self.clear_flights()
+        line, = self.ax.plot([], [], "r-", animated=True)
+        self.flights.append(Flight(x, y, line, self.clock.elapsed()))
+
+        self.ax.set_xlim(0, max(flight.x.max() for flight in self.flights) * 1.1)
+        self.ax.set_ylim(0, max(flight.y.max() for flight in self.flights) * 1.1)
         self.canvas.draw()
 
-        self.time_elapsed = 0
-        self.timer.start(20)
+        self.timer.start(FRAME_INTERVAL_MS)
 
     def update_animation(self):
-        if self.time_elapsed < len(self.x_data):
-            x = self.x_data[: self.time_elapsed + 1]
-            y = self.y_data[: self.time_elapsed + 1]
-            self.ax.clear()
-            self.ax.plot(x, y, "r-", label="Траектория")
-            self.ax.scatter(x[-1], y[-1], color="blue", label="Снаряд")
-            self.ax.set_xlim(0, max(self.x_data) * 1.1)
-            self.ax.set_ylim(0, max(self.y_data) * 1.1)
-            self.ax.set_xlabel("Расстояние (м)")
-            self.ax.set_ylabel("Высота (м)")
-            self.ax.legend()
-            self.canvas.draw()
-            self.time_elapsed += 1
-        else:
+        if self.background is None:
+            return
+        now = self.clock.elapsed()
+        moved = [(flight, flight.index_at(now)) for flight in self.flights]
+        moved = [(flight, index) for flight, index in moved if index > flight.shown]
+        if not moved:
+            return
+
+        # В сохранённый фон дорисовывается только новый кусок каждой траектории,
+        # поэтому кадр не дорожает по мере роста траектории
+        self.canvas.restore_region(self.background)
+        for flight, index in moved:
+            flight.line.set_data(flight.x[flight.shown: index + 1], flight.y[flight.shown: index + 1])
+            self.ax.draw_artist(flight.line)
+            flight.shown = index
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+
+        self.heads.set_offsets([(flight.x[flight.shown], flight.y[flight.shown]) for flight in self.flights])
+        self.ax.draw_artist(self.heads)
+        self.canvas.blit(self.ax.bbox)
+
+        if all(flight.finished() for flight in self.flights):
             self.timer.stop()
 
     def reset_simulation(self):
@@ -113,11 +170,9 @@ class ProjectileSimulation(QMainWindow):
         self.v0_spinbox.setValue(20)
         self.angle_slider.setValue(45)
         self.mass_spinbox.setValue(1)
-        self.ax.clear()
+        self.clear_flights()
         self.ax.set_xlim(0, 10)
         self.ax.set_ylim(0, 10)
-        self.ax.set_xlabel("Расстояние (м)")
-        self.ax.set_ylabel("Высота (м)")
         self.canvas.draw()
 
 
@@ -1,13 +1,15 @@
 import pygame
-import random
+import argparse
 import json
 import math
+import time
+import numpy as np
+from flock import Flock
 
-# Инициализация pygame и настройка окна
-pygame.init()
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-clock = pygame.time.Clock()
+FPS = 60
+STEP_TIME = 1 / FPS  # фиксированный шаг симуляции; скорости и времена заданы в шагах
+MAX_STEPS_PER_FRAME = 5  # если отрисовка не успевает, симуляция не должна уходить в догонялки
 
 # Параметры птиц и столбов
 BIRD_SPEED = 4  # скорость перемещения птицы
@@ -18,128 +20,169 @@ NEW_BIRD_INTERVAL_MAX = 600  # максимальный интервал для
 DISAPPEAR_PROBABILITY = 0.1  # Вероятность улететь "с концами" (10%)
 
 # Загрузка или инициализация данных
-def load_initial_state():
+def load_initial_state(rng, save=True):
+    def randint(low, high):
+        return int(rng.integers(low, high, endpoint=True))
+
     try:
         with open("initial_state.json") as f:
             data = json.load(f)
     except FileNotFoundError:
         # Если файл не найден, создаем начальные значения
         data = {
-            "poles": [{"position": (x, HEIGHT - 100), "strength": random.randint(1, 5), "birds": []}
+            "poles": [{"position": (x, HEIGHT - 100), "strength": randint(1, 5), "birds": []}
                       for x in range(100, WIDTH, 200)],
-            "birds": [{"position": [random.randint(0, WIDTH), random.randint(0, HEIGHT)],
-                       "target_pole": random.randint(0, len(range(100, WIDTH, 200)) - 1),
+            "birds": [{"position": [randint(0, WIDTH), randint(0, HEIGHT)],
+                       "target_pole": randint(0, len(range(100, WIDTH, 200)) - 1),
                        "state": "flying",
-                       "sit_time": random.randint(SIT_TIME_MIN, SIT_TIME_MAX),
-                       "time_sitting": 0} for _ in range(random.randint(5, 10))]  # случайное начальное число птиц
+                       "sit_time": randint(SIT_TIME_MIN, SIT_TIME_MAX),
+                       "time_sitting": 0} for _ in range(randint(5, 10))]  # случайное начальное число птиц
         }
-        with open("initial_state.json", "w") as f:
-            json.dump(data, f)
+        if save:
+            with open("initial_state.json", "w") as f:
+                json.dump(data, f)
+
+    # Проверка и инициализация всех ключей в столбах и птицах; случайное
+    # значение тянется, только если ключа нет
+    def fill(item, key, default):
+        if key not in item:
+            item[key] = default()
 
-    # Проверка и инициализация всех ключей в столбах и птицах
     for pole in data.get("poles", []):
-        pole.setdefault("position", (random.randint(100, WIDTH - 100), HEIGHT - 100))
-        pole.setdefault("strength", random.randint(1, 5))
+        fill(pole, "position", lambda: (randint(100, WIDTH - 100), HEIGHT - 100))
+        fill(pole, "strength", lambda: randint(1, 5))
         pole.setdefault("birds", [])
 
     for bird in data.get("birds", []):
-        bird.setdefault("position", [random.randint(0, WIDTH), random.randint(0, HEIGHT)])
-        bird.setdefault("target_pole", random.randint(0, len(data["poles"]) - 1))
+        fill(bird, "position", lambda: [randint(0, WIDTH), randint(0, HEIGHT)])
+        fill(bird, "target_pole", lambda: randint(0, len(data["poles"]) - 1))
         bird.setdefault("state", "flying")
-        bird.setdefault("sit_time", random.randint(SIT_TIME_MIN, SIT_TIME_MAX))
+        fill(bird, "sit_time", lambda: randint(SIT_TIME_MIN, SIT_TIME_MAX))
         bird.setdefault("time_sitting", 0)
 
     return data
 
-state = load_initial_state()
-
-# Функция для плавного перемещения птицы к цели
-def move_towards(bird, target, speed):
-    bx, by = bird["position"]
-    tx, ty = target
-    distance = math.hypot(tx - bx, ty - by)
-    if distance > speed:
-        bird["position"][0] += speed * (tx - bx) / distance
-        bird["position"][1] += speed * (ty - by) / distance
+def create_flock(state, rng):
+    return Flock.from_state(
+        state,
+        width=WIDTH,
+        height=HEIGHT,
+        speed=BIRD_SPEED,
+        sit_time_range=(SIT_TIME_MIN, SIT_TIME_MAX),
+        disappear_probability=DISAPPEAR_PROBABILITY,
+        spawn_interval_range=(NEW_BIRD_INTERVAL_MIN, NEW_BIRD_INTERVAL_MAX),
+        rng=rng,
+    )
+
+BIRD_RADIUS = 15
+BIRD_COLOR = (120, 120, 120)
+RASTER_MIN_BIRDS = 2000  # с этого числа птиц выгоднее закрасить всех одной маской
+
+def make_bird_sprite():
+    # Немного птиц рисуются готовым спрайтом, а не draw.circle на каждую;
+    # спрайт с colorkey блитится быстрее, чем с альфа-каналом
+    sprite = pygame.Surface((2 * BIRD_RADIUS, 2 * BIRD_RADIUS))
+    sprite.fill((255, 255, 255))
+    pygame.draw.circle(sprite, BIRD_COLOR, (BIRD_RADIUS, BIRD_RADIUS), BIRD_RADIUS)
+    sprite.set_colorkey((255, 255, 255))
+    return sprite.convert()
+
+# Полуширина круга птицы на каждой строке от -R до R
+BIRD_ROWS = [(dy, math.isqrt(BIRD_RADIUS ** 2 - dy ** 2)) for dy in range(-BIRD_RADIUS, BIRD_RADIUS + 1)]
+
+def bird_mask(xs, ys):
+    # Пиксели экрана под кругами птиц. Для каждой строки круга занятость окна
+    # [x - w, x + w] считается разностью префиксных сумм, поэтому время
+    # зависит от размера экрана, а не от числа птиц
+    r = BIRD_RADIUS
+    centers = np.zeros((HEIGHT + 2 * r + 1, WIDTH + 2 * r + 2), dtype=np.int16)
+    centers[ys + r, xs + r + 1] = 1
+    sums = np.cumsum(centers, axis=1, dtype=np.int16)
+    mask = np.zeros((HEIGHT, WIDTH), dtype=bool)
+    rows = {}
+    for dy, w in BIRD_ROWS:
+        if w not in rows:
+            rows[w] = sums[:, r + 1 + w:r + 1 + w + WIDTH] > sums[:, r - w:r - w + WIDTH]
+        mask |= rows[w][r + dy:r + dy + HEIGHT]
+    return mask
+
+def draw_birds(screen, bird_sprite, positions):
+    points = positions.astype(np.int64)
+    if len(points) >= RASTER_MIN_BIRDS:
+        pixels = pygame.surfarray.pixels2d(screen)
+        pixels[bird_mask(points[:, 0], points[:, 1]).T] = screen.map_rgb(BIRD_COLOR)
+        del pixels  # снимает блокировку поверхности
+        return
+    # Птицы на одном столбе совпадают до пикселя, поэтому каждая занятая
+    # точка рисуется один раз
+    keys = np.unique(points[:, 0] * (HEIGHT + 1) + points[:, 1])
+    xs, ys = np.divmod(keys, HEIGHT + 1)
+    screen.blits([(bird_sprite, (x - BIRD_RADIUS, y - BIRD_RADIUS)) for x, y in zip(xs.tolist(), ys.tolist())],
+                 doreturn=False)
+
+def run_window(state, flock):
+    # Инициализация pygame и настройка окна
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    clock = pygame.time.Clock()
+    bird_sprite = make_bird_sprite()
+
+    # Основной игровой цикл: симуляция идёт фиксированными шагами по реальному
+    # времени, а кадр рисует последний снимок, сколько бы шагов ни прошло
+    lag = 0.0
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+
+        lag = min(lag + clock.tick(FPS) / 1000, MAX_STEPS_PER_FRAME * STEP_TIME)
+        while lag >= STEP_TIME:
+            flock.step()
+            lag -= STEP_TIME
+        snapshot = flock.snapshot()
+
+        screen.fill((255, 255, 255))  # Очистка экрана
+        # Отрисовка столбов и птиц
+        for pole in state["poles"]:
+            pygame.draw.rect(screen, (0, 0, 0), (*pole["position"], 30, 100))  # Отрисовка столба
+
+        draw_birds(screen, bird_sprite, snapshot["positions"])
+
+        pygame.display.flip()  # Обновление экрана
+
+    pygame.quit()
+
+def run_headless(flock, frames):
+    # Без окна и без привязки к реальному времени: шаги идут подряд
+    started = time.perf_counter()
+    for _ in range(frames):
+        flock.step()
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    snapshot = flock.snapshot()
+    print(f"frames: {frames}, birds: {len(snapshot['positions'])}, "
+          f"sitting per pole: {snapshot['sitting'].tolist()}, {frames / elapsed:.0f} steps/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Птицы и столбы")
+    parser.add_argument("--seed", type=int, help="зерно генератора для воспроизводимого прогона")
+    parser.add_argument("--headless", action="store_true", help="считать без окна, быстрее реального времени")
+    parser.add_argument("--frames", type=int, default=10_000, help="число шагов в режиме --headless")
+    parser.add_argument("--birds", type=int, default=0, help="сколько птиц добавить к начальному состоянию")
+    args = parser.parse_args()
+
+    # Начальное состояние тянет числа из своего генератора: прогон с тем же
+    # зерном одинаков, есть initial_state.json или нет
+    state_seed, flock_seed = np.random.SeedSequence(args.seed).spawn(2)
+    rng = np.random.default_rng(flock_seed)
+    # Прогон без окна не подменяет сохранённое начальное состояние
+    state = load_initial_state(np.random.default_rng(state_seed), save=not args.headless)
+    flock = create_flock(state, rng)
+    flock.add_birds(args.birds)
+    if args.headless:
+        run_headless(flock, args.frames)
     else:
-        bird["position"] = list(target)  # Птица достигла цели
-
-# Функция для добавления новой птицы
-def add_new_bird(state):
-    new_bird = {
-        "position": [random.randint(0, WIDTH), random.randint(0, HEIGHT)],
-        "target_pole": random.randint(0, len(state["poles"]) - 1),
-        "state": "flying",
-        "sit_time": random.randint(SIT_TIME_MIN, SIT_TIME_MAX),
-        "time_sitting": 0
-    }
-    state["birds"].append(new_bird)
-
-# Основной игровой цикл
-next_bird_time = random.randint(NEW_BIRD_INTERVAL_MIN, NEW_BIRD_INTERVAL_MAX)  # случайное время для следующей птицы
-frame_count = 0  # счётчик кадров для отслеживания времени
-running = True
-while running:
-    screen.fill((255, 255, 255))  # Очистка экрана
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-    # Появление новой птицы через случайный интервал времени
-    if frame_count >= next_bird_time:
-        add_new_bird(state)
-        next_bird_time = frame_count + random.randint(NEW_BIRD_INTERVAL_MIN, NEW_BIRD_INTERVAL_MAX)
-
-    # Обновление состояния птиц
-    for bird in state["birds"][:]:  # Копия списка для безопасного удаления
-        # Проверка, что target_pole находится в пределах списка poles
-        pole_index = bird.get("target_pole", 0)
-        if pole_index >= len(state["poles"]):
-            pole_index = random.randint(0, len(state["poles"]) - 1)
-            bird["target_pole"] = pole_index
-
-        pole = state["poles"][pole_index]
-
-        if bird["state"] == "flying":
-            # Птица летит к столбу
-            move_towards(bird, pole["position"], BIRD_SPEED)
-            if bird["position"] == list(pole["position"]):  # Птица достигла столба
-                bird["state"] = "sitting"
-                bird["time_sitting"] = 0  # Сбрасываем таймер времени сидения
-                pole["birds"].append(bird)  # Добавляем птицу на столб
-
-        elif bird["state"] == "sitting":
-            # Птица сидит на столбе и отсчитывает время
-            bird["time_sitting"] += 1
-            if bird["time_sitting"] >= bird["sit_time"]:  # Время сидения вышло
-                bird["state"] = "leaving"
-                if bird in pole["birds"]:
-                    pole["birds"].remove(bird)  # Убираем птицу со столба
-
-        elif bird["state"] == "leaving":
-            # Птица улетает в случайную точку экрана
-            if "target_position" not in bird:
-                bird["target_position"] = [random.randint(0, WIDTH), random.randint(0, HEIGHT)]
-            move_towards(bird, bird["target_position"], BIRD_SPEED)
-            if bird["position"] == bird["target_position"]:
-                # Проверка вероятности улета с концами
-                if random.random() < DISAPPEAR_PROBABILITY:
-                    state["birds"].remove(bird)  # Удаляем птицу из симуляции
-                else:
-                    bird["state"] = "flying"  # Птица снова ищет столб
-                    bird["target_pole"] = random.randint(0, len(state["poles"]) - 1)
-                    bird.pop("target_position", None)  # Убираем цель, чтобы установить новую позже
-
-    # Отрисовка столбов и птиц
-    for pole in state["poles"]:
-        pygame.draw.rect(screen, (0, 0, 0), (*pole["position"], 30, 100))  # Отрисовка столба
-
-    for bird in state["birds"]:
-        pygame.draw.circle(screen, (120, 120, 120), (int(bird["position"][0]), int(bird["position"][1])), 15)  # Отрисовка птицы
-
-    pygame.display.flip()  # Обновление экрана
-    clock.tick(60)  # Ограничение FPS
-    frame_count += 1  # Увеличиваем счётчик кадров
-
-pygame.quit()
\ No newline at end of file
+        run_window(state, flock)
+
+if __name__ == "__main__":
+    main()
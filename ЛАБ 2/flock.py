@@ -0,0 +1,171 @@
+import numpy as np
+
+# Состояния птиц
+FLYING = 0
+SITTING = 1
+LEAVING = 2
+STATES = {"flying": FLYING, "sitting": SITTING, "leaving": LEAVING}
+
+# Поля птицы, по массиву на каждое
+FIELDS = ("position", "target", "target_pole", "state", "sit_time", "time_sitting")
+
+
+# Все птицы симуляции в виде массивов NumPy: каждое поле птицы — отдельный
+# массив, i-я птица — i-й элемент каждого из них. Шаг считается сразу для всех
+# птиц, без цикла по птицам в Python
+class Flock:
+    def __init__(self, poles, width, height, speed, sit_time_range, disappear_probability,
+                 spawn_interval_range, rng=None, capacity=1024):
+        self.poles = np.asarray(poles, dtype=float).reshape(-1, 2)  # координаты столбов
+        self.width = width
+        self.height = height
+        self.speed = speed
+        self.sit_time_range = sit_time_range
+        self.disappear_probability = disappear_probability
+        self.spawn_interval_range = spawn_interval_range
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        self.count = 0
+        self.position = np.empty((capacity, 2))
+        self.target = np.empty((capacity, 2))  # текущая цель: столб или точка, куда птица улетает
+        self.target_pole = np.empty(capacity, dtype=np.int32)
+        self.state = np.empty(capacity, dtype=np.int8)
+        self.sit_time = np.empty(capacity, dtype=np.int32)
+        self.time_sitting = np.empty(capacity, dtype=np.int32)
+
+        self.frame = 0
+        self.next_bird_frame = self._spawn_delay()
+
+    def _grow(self, needed):
+        capacity = len(self.state)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in FIELDS:
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def _spawn_delay(self):
+        low, high = self.spawn_interval_range
+        return self.frame + int(self.rng.integers(low, high, endpoint=True))
+
+    def _random_points(self, n):
+        return np.column_stack((
+            self.rng.integers(0, self.width, n, endpoint=True),
+            self.rng.integers(0, self.height, n, endpoint=True),
+        )).astype(float)
+
+    def _random_poles(self, n):
+        return self.rng.integers(0, len(self.poles), n)
+
+    def add_birds(self, n, positions=None, target_poles=None, states=None, sit_times=None, time_sitting=None):
+        start, stop = self.count, self.count + n
+        self._grow(stop)
+        low, high = self.sit_time_range
+        self.position[start:stop] = self._random_points(n) if positions is None else positions
+        self.target_pole[start:stop] = self._random_poles(n) if target_poles is None else target_poles
+        self.state[start:stop] = FLYING if states is None else states
+        self.sit_time[start:stop] = self.rng.integers(low, high, n, endpoint=True) if sit_times is None else sit_times
+        self.time_sitting[start:stop] = 0 if time_sitting is None else time_sitting
+        self.count = stop
+
+        self.target[start:stop] = self.poles[self.target_pole[start:stop]]
+        leaving = np.flatnonzero(self.state[start:stop] == LEAVING) + start
+        self.target[leaving] = self._random_points(len(leaving))
+
+    @classmethod
+    def from_state(cls, data, **options):
+        # Совместимость с форматом initial_state.json
+        flock = cls([pole["position"] for pole in data["poles"]], **options)
+        birds = data["birds"]
+        if birds:
+            target_poles = np.array([bird["target_pole"] for bird in birds])
+            # Номер столба из файла может выходить за пределы списка столбов
+            invalid = target_poles >= len(flock.poles)
+            target_poles[invalid] = flock._random_poles(int(invalid.sum()))
+            flock.add_birds(
+                len(birds),
+                positions=[bird["position"] for bird in birds],
+                target_poles=target_poles,
+                states=[STATES[bird["state"]] for bird in birds],
+                sit_times=[bird["sit_time"] for bird in birds],
+                time_sitting=[bird["time_sitting"] for bird in birds],
+            )
+        return flock
+
+    def step(self):
+        if self.frame >= self.next_bird_frame:
+            self.add_birds(1)
+            self.next_bird_frame = self._spawn_delay()
+        self.frame += 1
+
+        n = self.count
+        position = self.position[:n]
+        target = self.target[:n]
+        state = self.state[:n]
+        flying = state == FLYING
+        sitting = state == SITTING
+        leaving = state == LEAVING
+
+        # Перемещение к цели: на speed пикселей или сразу в цель, если она ближе
+        delta = target - position
+        distance = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+        moving = ~sitting
+        arrived = moving & (distance <= self.speed)
+        delta *= np.where(moving & ~arrived, self.speed / np.maximum(distance, self.speed), 0.0)[:, None]
+        position += delta
+        position[arrived] = target[arrived]
+
+        # Долетевшие до столба садятся
+        landed = flying & arrived
+        state[landed] = SITTING
+        self.time_sitting[:n][landed] = 0
+
+        # Отсидевшие своё улетают в случайную точку
+        time_sitting = self.time_sitting[:n]
+        time_sitting += sitting
+        done = np.flatnonzero(sitting & (time_sitting >= self.sit_time[:n]))
+        state[done] = LEAVING
+        target[done] = self._random_points(len(done))
+
+        # Долетевшие до точки либо исчезают, либо снова ищут столб
+        left = np.flatnonzero(leaving & arrived)
+        gone = self.rng.random(len(left)) < self.disappear_probability
+        back = left[~gone]
+        state[back] = FLYING
+        self.target_pole[back] = self._random_poles(len(back))
+        target[back] = self.poles[self.target_pole[back]]
+        if gone.any():
+            self._remove(left[gone])
+
+    def _remove(self, indices):
+        # За кадр исчезает немного птиц: на их места переносятся птицы
+        # с конца массивов, остальные массивы не трогаются
+        remaining = self.count - len(indices)
+        tail = np.arange(remaining, self.count)
+        movers = tail[~np.isin(tail, indices)]
+        holes = indices[indices < remaining]
+        for name in FIELDS:
+            array = getattr(self, name)
+            array[holes] = array[movers]
+        self.count = remaining
+
+    def positions(self):
+        return self.position[:self.count]
+
+    def snapshot(self):
+        # Копия для отрисовки: следующий шаг не меняет уже выданный снимок
+        return {
+            "frame": self.frame,
+            "positions": self.position[:self.count].copy(),
+            "states": self.state[:self.count].copy(),
+            "sitting": self.sitting_counts(),
+        }
+
+    def sitting_counts(self):
+        # Сколько птиц сидит на каждом столбе
+        sitting = self.state[:self.count] == SITTING
+        return np.bincount(self.target_pole[:self.count][sitting], minlength=len(self.poles))
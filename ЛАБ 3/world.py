@@ -0,0 +1,188 @@
+from bisect import bisect_left, insort
+import math
+import random
+
+GROUND_LEVEL = 600
+BIRD_SPEED = 2
+SIT_TIME_MIN = 50
+SIT_TIME_MAX = 120
+DISAPPEAR_PROBABILITY = 0.2
+BIRD_RADIUS = 15
+POLE_WIDTH = 30
+POLE_HEIGHT = 100
+POLE_TOP_PADDING = 0
+POLE_MIN_DISTANCE = 100
+POLE_STRENGTH = 5
+SCENE_WIDTH = 2000
+STEP_TIME = 0.012  # фиксированный шаг симуляции, секунды; скорости заданы в шагах
+
+
+class PoleModel:
+    def __init__(self, pole_id, x, strength):
+        self.id = pole_id
+        self.position = (x, GROUND_LEVEL)
+        self.strength = strength
+        self.birds = {}  # id птицы -> птица, в порядке посадки
+        self.sitting_point = (x, GROUND_LEVEL - POLE_HEIGHT - BIRD_RADIUS - POLE_TOP_PADDING)
+
+    def is_overloaded(self):
+        return len(self.birds) > self.strength
+
+
+class BirdModel:
+    def __init__(self, bird_id, position, target_pole, sit_time):
+        self.id = bird_id
+        self.position = position
+        self.target_pole = target_pole
+        self.sit_time = sit_time
+        self.time_sitting = 0
+        self.state = "flying"
+        self.target_position = None
+
+    def move_towards(self, target, speed):
+        bx, by = self.position
+        tx, ty = target
+        distance = math.hypot(tx - bx, ty - by)
+        if distance > speed:
+            self.position[0] += speed * (tx - bx) / distance
+            self.position[1] += speed * (ty - by) / distance
+        else:
+            self.position = list(target)
+
+
+# Вся логика птиц и столбов без Qt: окно только показывает снимки мира,
+# а без окна мир можно прогонять с любой скоростью и воспроизводимо по зерну
+class World:
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.poles = {}
+        self.birds = {}
+        self.frame = 0
+        # Столбы, отсортированные по x: (x, id). Место под новый столб и
+        # случайный столб ищутся по нему без перебора всех столбов
+        self.pole_index = []
+        # Столбы, которые могли перегрузиться за шаг: проверяются в конце шага
+        self.overload_candidates = {}
+        self._last_id = 0
+
+    def _next_id(self):
+        self._last_id += 1
+        return self._last_id
+
+    def _random_point(self):
+        return [self.rng.randint(0, SCENE_WIDTH), self.rng.randint(0, GROUND_LEVEL - BIRD_RADIUS)]
+
+    def _random_pole(self):
+        return self.poles[self.rng.choice(self.pole_index)[1]] if self.pole_index else None
+
+    def _free_gaps(self):
+        # Отрезки допустимых x между соседними столбами
+        low = 50
+        for x, _ in self.pole_index:
+            yield low, min(x - POLE_MIN_DISTANCE, SCENE_WIDTH - 50)
+            low = max(low, x + POLE_MIN_DISTANCE)
+        yield low, SCENE_WIDTH - 50
+
+    def _free_x(self):
+        # Равномерно по свободному месту сразу, без повторных попыток;
+        # None, если столбу негде встать
+        gaps = [(low, high) for low, high in self._free_gaps() if low <= high]
+        free = sum(high - low + 1 for low, high in gaps)
+        if not free:
+            return None
+        offset = self.rng.randrange(free)
+        for low, high in gaps:
+            if offset <= high - low:
+                return low + offset
+            offset -= high - low + 1
+
+    def add_pole(self, x=None, strength=POLE_STRENGTH):
+        if not x:
+            x = self._free_x()
+            if x is None:
+                return None
+        pole = PoleModel(self._next_id(), x, strength)
+        self.poles[pole.id] = pole
+        insort(self.pole_index, (x, pole.id))
+        return pole
+
+    def remove_pole(self, pole):
+        del self.poles[pole.id]
+        del self.pole_index[bisect_left(self.pole_index, (pole.position[0], pole.id))]
+
+    def add_bird(self):
+        bird = BirdModel(self._next_id(), self._random_point(), self._random_pole(),
+                         self.rng.randint(SIT_TIME_MIN, SIT_TIME_MAX))
+        self.birds[bird.id] = bird
+        return bird
+
+    def set_strength(self, pole_id, strength):
+        pole = self.poles[pole_id]
+        pole.strength = strength
+        self.overload_candidates[pole_id] = pole
+
+    def step(self):
+        self.frame += 1
+        for bird in list(self.birds.values()):
+            if bird.state == "flying":
+                # Столб мог рухнуть, пока птица к нему летела
+                if bird.target_pole is None or bird.target_pole.id not in self.poles:
+                    bird.target_pole = self._random_pole()
+                    if bird.target_pole is None:
+                        continue
+                bird.move_towards(bird.target_pole.sitting_point, BIRD_SPEED)
+                if bird.position == list(bird.target_pole.sitting_point):
+                    bird.state = "sitting"
+                    bird.time_sitting = 0
+                    bird.target_pole.birds[bird.id] = bird
+                    self.overload_candidates[bird.target_pole.id] = bird.target_pole
+
+            elif bird.state == "sitting":
+                bird.time_sitting += 1
+                if bird.time_sitting >= bird.sit_time:
+                    bird.state = "leaving"
+                    if bird.target_pole:
+                        del bird.target_pole.birds[bird.id]
+                    bird.target_pole = None
+
+            elif bird.state == "leaving":
+                if not bird.target_position:
+                    bird.target_position = self._random_point()
+                bird.move_towards(bird.target_position, BIRD_SPEED)
+                if bird.position == bird.target_position:
+                    if self.rng.random() < DISAPPEAR_PROBABILITY:
+                        del self.birds[bird.id]
+                    else:
+                        bird.state = "flying"
+                        bird.target_position = None
+                        bird.target_pole = self._random_pole()
+
+        # Перегрузиться может только столб, на который за шаг села птица
+        # или у которого убавили прочность
+        candidates, self.overload_candidates = self.overload_candidates, {}
+        for pole in candidates.values():
+            if pole.id in self.poles and pole.is_overloaded():
+                self.collapse(pole)
+
+    def collapse(self, pole):
+        # Перегруженный столб падает, птицы с него разлетаются или исчезают
+        self.remove_pole(pole)
+        for bird in pole.birds.values():
+            if self.rng.random() > DISAPPEAR_PROBABILITY:
+                bird.state = "leaving"
+                bird.target_pole = None
+                bird.target_position = None
+            else:
+                del self.birds[bird.id]
+        pole.birds.clear()
+
+    def run(self, frames):
+        for _ in range(frames):
+            self.step()
+
+    def snapshot(self):
+        return {
+            "frame": self.frame,
+            "birds": [(bird.id, bird.position[0], bird.position[1], bird.state) for bird in self.birds.values()],
+            "poles": [(pole.id, pole.position[0], pole.strength, len(pole.birds)) for pole in self.poles.values()],
+        }